@@ -14,29 +14,104 @@ import uuid
 import pandas as pd
 import threading
 import tempfile
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+import gzip
+from datetime import datetime, timezone
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, jsonify, send_file
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
 import logging
-import random
+import logging.handlers
+import queue
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import nullcontext
+import csv
+import io
+import re
+import sqlite3
+from pathlib import Path
+
+# Optional fast paths for building the simplified download file
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pc = None
+    pa_csv = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pandas only gained the 'calamine' engine in 2.2, so older pandas keeps openpyxl
+# even when python_calamine is installed
+EXCEL_READ_ENGINE = 'openpyxl'
+if tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2):
+    try:
+        import python_calamine  # Rust-backed xlsx reader, used through pandas' 'calamine' engine
+        EXCEL_READ_ENGINE = 'calamine'
+    except ImportError:
+        pass
 
 # Import the enhanced PAN-GSTIN mapper
 import pan_gstin_mapper_enhanced as mapper
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("flask_pan_gstin.log"),
-        logging.StreamHandler()
-    ]
-)
+# Logging configuration
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()  # e.g. WARNING to skip per-GSTIN info lines
+LOG_BUFFER_RECORDS = 256  # Records buffered before the log file is written
+
+def configure_logging():
+    """
+    Send all log records through a queue so request and worker threads never wait on
+    log file writes; a background listener thread formats and writes them.
+    
+    Returns:
+        QueueListener: The started listener, stopped again at exit
+    """
+    root = logging.getLogger()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    
+    # Buffer writes to the log file; warnings and errors are flushed straight away
+    file_handler = logging.FileHandler("flask_pan_gstin.log")
+    file_handler.setFormatter(formatter)
+    buffered_file_handler = logging.handlers.MemoryHandler(
+        LOG_BUFFER_RECORDS, flushLevel=logging.WARNING, target=file_handler
+    )
+    
+    # Keep the handlers the mapper already installed (its own log file and stdout)
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    for handler in handlers:
+        root.removeHandler(handler)
+        if handler.formatter is None:
+            handler.setFormatter(formatter)
+    
+    listener = logging.handlers.QueueListener(
+        queue.SimpleQueue(), buffered_file_handler, *handlers, respect_handler_level=True
+    )
+    root.addHandler(logging.handlers.QueueHandler(listener.queue))
+    root.setLevel(LOG_LEVEL)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+configure_logging()
 logger = logging.getLogger(__name__)
 
+class UploadRequest(Request):
+    """Request that spools multipart file uploads to disk instead of memory"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Werkzeug keeps uploads under 500KB in memory and copies them to disk once they
+        # grow past that; write to a temporary file from the first byte instead
+        return tempfile.TemporaryFile('wb+')
+
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 app.secret_key = os.urandom(24)
 
@@ -45,72 +120,472 @@ app.secret_key = os.urandom(24)
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 RESULTS_FOLDER = 'results'
+UPLOAD_PATH_TEMPLATE = os.path.join(UPLOAD_FOLDER, '{job_id}_{filename}')  # Where each job's upload is saved
 ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+SIMPLIFIED_COLUMNS = ["PAN_Reference", "GSTIN", "GSTIN Status"]
+SIMPLIFIED_COLUMN_SET = frozenset(SIMPLIFIED_COLUMNS)
+GSTIN_PATTERN = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][0-9A-Z]Z[0-9A-Z]$')
+GSTIN_CHARSET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+GSTIN_CHAR_VALUES = {char: value for value, char in enumerate(GSTIN_CHARSET)}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
+SIMPLIFIED_TEMP_DIR = os.path.abspath(os.path.join(RESULTS_FOLDER, 'temp'))  # Simplified download files
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+# Let a fronting web server (e.g. Nginx with X-Sendfile/X-Accel-Redirect) stream result downloads
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+STREAM_CHUNK_SIZE = 1 << 20  # Read raw uploads in 1MB chunks
+CSV_STRUCTURAL_PATTERN = r'[,"\r\n]'  # Characters that force a CSV field to be quoted
+DOWNLOAD_GZIP_LEVEL = 6  # gzip level for compressed downloads; CSV text shrinks several-fold
+
+JOBS_DB = 'jobs.db'
+LEGACY_JOBS_FILE = 'jobs.json'
 
 # Create necessary directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(RESULTS_FOLDER, exist_ok=True)
 
+# Maximum number of jobs driving a browser at the same time; further jobs wait in the queue
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 2))
+
+# Batch GSTIN updates run this many lookups at once, sharing one cap on GST portal page
+# loads per second (captcha retry refreshes included)
+BATCH_UPDATE_WORKERS = int(os.environ.get('BATCH_UPDATE_WORKERS', 4))
+PORTAL_REQUESTS_PER_SECOND = float(os.environ.get('PORTAL_REQUESTS_PER_SECOND', 0.5))
+
+# Seconds a successful GSTIN detail lookup is reused before the portal is queried again
+GSTIN_DETAILS_CACHE_TTL = int(os.environ.get('GSTIN_DETAILS_CACHE_TTL_HOURS', 24)) * 3600
+GSTIN_DETAILS_MEMO_SIZE = 4096  # Most recently used lookups also kept in memory
+
+# Job fields holding timestamps, stored as nanoseconds since the epoch
+TIMESTAMP_FIELDS = ('created_at', 'start_time', 'end_time')
+
+# Job fields that never change after the job is created
+STATIC_JOB_FIELDS = frozenset({'id', 'type', 'filename', 'file_path', 'parameters', 'created_at', 'gstins', 'excel_file'})
+
 # Global variables to track jobs
 jobs = {}
+job_slots = threading.BoundedSemaphore(MAX_CONCURRENT_JOBS)
+# The mapper keeps one checkpoint for the PAN run in progress, so PAN jobs run one at a time
+pan_job_lock = threading.Lock()
+jobs_db = None
+db_lock = threading.Lock()
+
+# Most recently completed result file, updated as jobs complete
+latest_result_file = None
+latest_result_mtime = 0.0
+
+# Recent successful GSTIN detail lookups as (details, fetch time), least recently used
+# first; backed by the gstin_details table
+gstin_details_cache = OrderedDict()
+gstin_details_lock = threading.Lock()
+
+# Progress parsed from the checkpoint files, keyed by their (mtime, size)
+checkpoint_progress_cache = None
+
+# JSON of each job's static fields, built on the first status poll
+job_static_json = {}
 
 def allowed_file(filename):
     """Check if the file has an allowed extension"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+class TokenBucket:
+    """Thread-safe token bucket that limits how often the GST portal is queried"""
+    
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+portal_rate_limiter = TokenBucket(PORTAL_REQUESTS_PER_SECOND)
+
+def dumps_json(data):
+    """Serialize data to a JSON string, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data)
+
+def loads_json(data):
+    """Parse a JSON string or bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def gstin_checksum_ok(gstin):
+    """Check the last character of a GSTIN against the checksum of the first 14"""
+    total = 0
+    for i, char in enumerate(gstin[:14]):
+        product = GSTIN_CHAR_VALUES[char] * (2 if i % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARSET[(36 - total % 36) % 36] == gstin[14]
+
+def is_valid_gstin(gstin):
+    """Check the GSTIN format and checksum locally, without a portal lookup"""
+    return isinstance(gstin, str) and GSTIN_PATTERN.match(gstin) is not None and gstin_checksum_ok(gstin)
+
+def run_in_background(target, *args, lock=None):
+    """
+    Run a job in a daemon thread once one of the job slots is free. A job given a
+    lock also waits for it first, without holding a slot other jobs could use.
+    """
+    def run():
+        with lock or nullcontext(), job_slots:
+            target(*args)
+    
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
 def process_file_in_background(job_id, file_path, headless, test_mode, limit, resume):
     """Process the file in a background thread"""
     try:
         logger.info(f"Starting background processing for job {job_id}")
         jobs[job_id]['status'] = 'processing'
-        jobs[job_id]['start_time'] = datetime.now().isoformat()
+        jobs[job_id]['start_time'] = time.time_ns()
         
         # Call the enhanced PAN-GSTIN mapper
         mapper.process_pan_numbers(file_path, headless, test_mode, limit, resume)
         
         # Update job status
         jobs[job_id]['status'] = 'completed'
-        jobs[job_id]['end_time'] = datetime.now().isoformat()
+        jobs[job_id]['end_time'] = time.time_ns()
         jobs[job_id]['result_file'] = file_path
+        record_result_file(file_path)
         
         logger.info(f"Background processing completed for job {job_id}")
         
-        # Save updated jobs to file
-        save_jobs_to_file()
+        # Save updated job
+        save_job(job_id)
     except Exception as e:
         logger.error(f"Error in background processing for job {job_id}: {e}")
         jobs[job_id]['status'] = 'failed'
         jobs[job_id]['error'] = str(e)
-        jobs[job_id]['end_time'] = datetime.now().isoformat()
-        save_jobs_to_file()
+        jobs[job_id]['end_time'] = time.time_ns()
+        save_job(job_id)
+
+def record_result_file(file_path):
+    """Remember a newly completed result file as the most recent one"""
+    global latest_result_file, latest_result_mtime
+    latest_result_file = file_path
+    latest_result_mtime = time.time()
+
+def refresh_latest_result_file():
+    """Find the most recent result file among the completed jobs"""
+    global latest_result_file, latest_result_mtime
+    latest_result_file = None
+    latest_result_mtime = 0.0
+    for job in jobs.values():
+        if job['status'] == 'completed' and 'result_file' in job and os.path.exists(job['result_file']):
+            mtime = os.path.getmtime(job['result_file'])
+            if latest_result_file is None or mtime > latest_result_mtime:
+                latest_result_file = job['result_file']
+                latest_result_mtime = mtime
+
+def init_jobs_db():
+    """Open the jobs database and create the tables if they don't exist"""
+    global jobs_db
+    jobs_db = sqlite3.connect(JOBS_DB, check_same_thread=False)
+    jobs_db.execute("PRAGMA journal_mode=WAL")
+    jobs_db.execute("PRAGMA synchronous=NORMAL")
+    with jobs_db:
+        # payload holds the fields that never change, written once; state holds the rest
+        jobs_db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT, payload TEXT, state TEXT)")
+        columns = [row[1] for row in jobs_db.execute("PRAGMA table_info(jobs)")]
+        if 'state' not in columns:
+            jobs_db.execute("ALTER TABLE jobs ADD COLUMN state TEXT")
+        jobs_db.execute(
+            "CREATE TABLE IF NOT EXISTS job_results "
+            "(job_id TEXT, gstin TEXT, success INTEGER, error TEXT, details TEXT)"
+        )
+        jobs_db.execute("CREATE INDEX IF NOT EXISTS job_results_job_id ON job_results (job_id)")
+        jobs_db.execute("CREATE TABLE IF NOT EXISTS gstin_details (gstin TEXT PRIMARY KEY, details TEXT, updated_at INTEGER)")
+        columns = [row[1] for row in jobs_db.execute("PRAGMA table_info(gstin_details)")]
+        if 'updated_at' not in columns:
+            # Rows cached before lookups were timestamped count as expired
+            jobs_db.execute("ALTER TABLE gstin_details ADD COLUMN updated_at INTEGER")
 
-def save_jobs_to_file():
-    """Save jobs data to a JSON file"""
+def job_state_json(job):
+    """Serialize the fields of a job that change while it runs (status, progress, times...)"""
+    # Per-GSTIN results are stored as rows in job_results
+    return dumps_json({key: value for key, value in job.items()
+                       if key not in STATIC_JOB_FIELDS and key != 'results'})
+
+def save_job(job_id):
+    """
+    Save a single job to the jobs database. The fields that never change, such as a
+    batch's GSTIN list, are written when the job is first saved; later saves only
+    update the small changing part, so per-GSTIN progress ticks stay cheap.
+    """
     try:
-        with open('jobs.json', 'w') as f:
-            json.dump(jobs, f, indent=2)
+        job = jobs[job_id]
+        state = job_state_json(job)
+        with db_lock, jobs_db:
+            updated = jobs_db.execute(
+                "UPDATE jobs SET status = ?, state = ? WHERE id = ?",
+                (job['status'], state, job_id)
+            ).rowcount
+            if not updated:
+                payload = dumps_json({key: value for key, value in job.items() if key in STATIC_JOB_FIELDS})
+                jobs_db.execute(
+                    "INSERT INTO jobs (id, status, payload, state) VALUES (?, ?, ?, ?)",
+                    (job_id, job['status'], payload, state)
+                )
     except Exception as e:
-        logger.error(f"Error saving jobs data: {e}")
+        logger.error(f"Error saving job {job_id}: {e}")
 
-def load_jobs_from_file():
-    """Load jobs data from a JSON file"""
+def store_job_results(job_id, results):
+    """Insert per-GSTIN results of a batch job into the jobs database"""
+    rows = [
+        (job_id, result['gstin'], int(result['success']), result.get('error'),
+         dumps_json(result['details']) if 'details' in result else None)
+        for result in results
+    ]
+    with db_lock, jobs_db:
+        jobs_db.executemany(
+            "INSERT INTO job_results (job_id, gstin, success, error, details) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+
+def add_job_result(job_id, result):
+    """Record the result for one GSTIN of a batch job"""
+    jobs[job_id]['results'].append(result)
+    try:
+        store_job_results(job_id, [result])
+    except Exception as e:
+        logger.error(f"Error saving result for job {job_id}: {e}")
+
+def delete_job(job_id):
+    """Remove a job and its results from the jobs database"""
+    job = jobs.pop(job_id)
+    job_static_json.pop(job_id, None)
+    if job.get('result_file') == latest_result_file:
+        refresh_latest_result_file()
+    try:
+        with db_lock, jobs_db:
+            jobs_db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            jobs_db.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+    except Exception as e:
+        logger.error(f"Error deleting job {job_id}: {e}")
+
+def format_timestamp(value):
+    """
+    Render a job timestamp as an ISO 8601 string.
+    
+    Args:
+        value: Nanoseconds since the epoch, as stored in the jobs dict
+        
+    Returns:
+        str: The timestamp in UTC, or the value unchanged if it is not a timestamp
+    """
+    if not isinstance(value, int):
+        return value
+    return datetime.fromtimestamp(value / 1e9, tz=timezone.utc).isoformat()
+
+def parse_timestamp(value):
+    """Convert an ISO 8601 string saved by older versions to nanoseconds since the epoch"""
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp() * 1e9)
+    return value
+
+def job_for_response(job):
+    """Copy of a job with its timestamps rendered as ISO 8601 strings for JSON responses"""
+    response = dict(job)
+    for field in TIMESTAMP_FIELDS:
+        if field in response:
+            response[field] = format_timestamp(response[field])
+    return response
+
+def job_status_json(job_id):
+    """
+    Serialize a job for the status endpoint. The fields that never change are
+    serialized on the first poll and reused; only the rest is encoded each time.
+    
+    Args:
+        job_id: ID of the job
+        
+    Returns:
+        str: The job as a JSON object
+    """
+    job = jobs[job_id]
+    static_json = job_static_json.get(job_id)
+    if static_json is None:
+        static_json = dumps_json(job_for_response({k: v for k, v in job.items() if k in STATIC_JOB_FIELDS}))
+        job_static_json[job_id] = static_json
+    
+    dynamic_json = dumps_json(job_for_response({k: v for k, v in job.items() if k not in STATIC_JOB_FIELDS}))
+    if static_json == '{}':
+        return dynamic_json
+    if dynamic_json == '{}':
+        return static_json
+    return f"{static_json[:-1]},{dynamic_json[1:]}"
+
+@app.template_filter('isotime')
+def isotime_filter(value):
+    """Template filter rendering a job timestamp as an ISO 8601 string"""
+    return format_timestamp(value)
+
+def load_jobs():
+    """Load jobs data from the jobs database, importing the legacy JSON file if present"""
     global jobs
     try:
-        if os.path.exists('jobs.json'):
-            with open('jobs.json', 'r') as f:
-                jobs = json.load(f)
+        with db_lock:
+            rows = jobs_db.execute("SELECT id, payload, state FROM jobs").fetchall()
+            result_rows = jobs_db.execute(
+                "SELECT job_id, gstin, success, error, details FROM job_results ORDER BY rowid"
+            ).fetchall()
+        
+        if not rows and os.path.exists(LEGACY_JOBS_FILE):
+            with open(LEGACY_JOBS_FILE, 'rb') as f:
+                jobs = loads_json(f.read())
+            for job_id, job in jobs.items():
+                for field in TIMESTAMP_FIELDS:
+                    if field in job:
+                        job[field] = parse_timestamp(job[field])
+                save_job(job_id)
+                store_job_results(job_id, job.get('results', []))
+            logger.info(f"Imported {len(jobs)} jobs from {LEGACY_JOBS_FILE}")
+            return
+        
+        jobs = {}
+        for job_id, payload, state in rows:
+            job = jobs[job_id] = loads_json(payload)
+            # Rows saved before the state column existed keep everything in payload
+            if state is not None:
+                job.update(loads_json(state))
+        for job in jobs.values():
+            for field in TIMESTAMP_FIELDS:
+                if field in job:
+                    job[field] = parse_timestamp(job[field])
+        for job_id, gstin, success, error, details in result_rows:
+            if job_id not in jobs:
+                continue
+            result = {'gstin': gstin, 'success': bool(success)}
+            if error is not None:
+                result['error'] = error
+            if details is not None:
+                result['details'] = loads_json(details)
+            jobs[job_id].setdefault('results', []).append(result)
     except Exception as e:
         logger.error(f"Error loading jobs data: {e}")
         jobs = {}
+    finally:
+        refresh_latest_result_file()
+
+def remember_gstin_details(gstin, details, fetched_at):
+    """Keep a lookup in the in-memory cache, dropping the least recently used beyond its size"""
+    with gstin_details_lock:
+        gstin_details_cache[gstin] = (details, fetched_at)
+        gstin_details_cache.move_to_end(gstin)
+        while len(gstin_details_cache) > GSTIN_DETAILS_MEMO_SIZE:
+            gstin_details_cache.popitem(last=False)
+
+def get_gstin_details_cached(gstin, rate_limiter=None, browsers=None):
+    """
+    Get details for a GSTIN, reusing the result of an earlier successful lookup
+    made within GSTIN_DETAILS_CACHE_TTL.
+    
+    Args:
+        gstin: The GSTIN to look up
+        rate_limiter: Optional TokenBucket to wait on before each GST portal page load
+        browsers: Optional mapper.GstinBrowsers to reuse the calling thread's browser from
+        
+    Returns:
+        tuple: (details dictionary, True if the details came from the cache)
+    """
+    details = None
+    cutoff = int(time.time()) - GSTIN_DETAILS_CACHE_TTL
+    with gstin_details_lock:
+        cached = gstin_details_cache.get(gstin)
+        if cached is not None:
+            if cached[1] >= cutoff:
+                details = cached[0]
+                gstin_details_cache.move_to_end(gstin)
+            else:
+                del gstin_details_cache[gstin]
+    if details is None:
+        with db_lock:
+            row = jobs_db.execute(
+                "SELECT details, updated_at FROM gstin_details WHERE gstin = ? AND updated_at >= ?",
+                (gstin, cutoff)
+            ).fetchone()
+        if row:
+            details = loads_json(row[0])
+            remember_gstin_details(gstin, details, row[1])
+    
+    if details is not None:
+        logger.info(f"Using cached details for GSTIN: {gstin}")
+        return dict(details), True
+    
+    details = mapper.get_gstin_details(gstin, browsers=browsers, rate_limiter=rate_limiter)
+    
+    # Only cache successful lookups so failures are retried
+    if 'error' not in details:
+        fetched_at = int(time.time())
+        remember_gstin_details(gstin, dict(details), fetched_at)
+        try:
+            with db_lock, jobs_db:
+                jobs_db.execute(
+                    "INSERT OR REPLACE INTO gstin_details (gstin, details, updated_at) VALUES (?, ?, ?)",
+                    (gstin, dumps_json(details), fetched_at)
+                )
+        except Exception as e:
+            logger.error(f"Error caching details for GSTIN {gstin}: {e}")
+    
+    return details, False
 
 @app.route('/')
 def home():
     """Home page with file upload form"""
     return render_template('index.html', now=datetime.now())
 
+def parse_job_parameters(values):
+    """Read the processing parameters from the submitted form or query string"""
+    headless = 'headless' in values
+    test_mode = 'test_mode' in values
+    resume = 'resume' in values
+    limit = values.get('limit', '')
+    limit = int(limit) if limit and limit.isdigit() else None
+    return headless, test_mode, limit, resume
+
+def start_job(job_id, filename, file_path, headless, test_mode, limit, resume):
+    """Create a job entry for an uploaded file and start processing it"""
+    # Create a job entry
+    jobs[job_id] = {
+        'id': job_id,
+        'filename': filename,
+        'file_path': file_path,
+        'status': 'queued',
+        'created_at': time.time_ns(),
+        'parameters': {
+            'headless': headless,
+            'test_mode': test_mode,
+            'limit': limit,
+            'resume': resume
+        }
+    }
+    
+    # Save the new job
+    save_job(job_id)
+    
+    # Start processing in background
+    run_in_background(process_file_in_background, job_id, file_path, headless, test_mode, limit, resume,
+                      lock=pan_job_lock)
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and start processing"""
@@ -130,41 +605,13 @@ def upload_file():
         
         # Secure the filename and save the file
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{job_id}_{filename}")
+        file_path = UPLOAD_PATH_TEMPLATE.format(job_id=job_id, filename=filename)
         file.save(file_path)
         
         # Get parameters from form
-        headless = 'headless' in request.form
-        test_mode = 'test_mode' in request.form
-        resume = 'resume' in request.form
-        limit = request.form.get('limit', '')
-        limit = int(limit) if limit and limit.isdigit() else None
+        headless, test_mode, limit, resume = parse_job_parameters(request.form)
         
-        # Create a job entry
-        jobs[job_id] = {
-            'id': job_id,
-            'filename': filename,
-            'file_path': file_path,
-            'status': 'queued',
-            'created_at': datetime.now().isoformat(),
-            'parameters': {
-                'headless': headless,
-                'test_mode': test_mode,
-                'limit': limit,
-                'resume': resume
-            }
-        }
-        
-        # Save jobs to file
-        save_jobs_to_file()
-        
-        # Start processing in background
-        thread = threading.Thread(
-            target=process_file_in_background,
-            args=(job_id, file_path, headless, test_mode, limit, resume)
-        )
-        thread.daemon = True
-        thread.start()
+        start_job(job_id, filename, file_path, headless, test_mode, limit, resume)
         
         # Redirect to results page
         return redirect(url_for('results', job_id=job_id))
@@ -172,6 +619,48 @@ def upload_file():
     flash('Invalid file type. Please upload an Excel or CSV file.')
     return redirect(url_for('home'))
 
+@app.route('/upload_stream', methods=['POST'])
+def upload_stream():
+    """
+    Handle a raw (non-multipart) file upload and start processing.
+    
+    The request body is the file itself and is streamed straight to disk. The
+    filename is passed in the X-Filename header and the processing parameters
+    in the query string.
+    """
+    filename = secure_filename(request.headers.get('X-Filename', ''))
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type. Please upload an Excel or CSV file.'}), 400
+    
+    # Reject oversized uploads before reading any of the body
+    content_length = request.content_length
+    if content_length is None:
+        return jsonify({'error': 'Content-Length header is required'}), 411
+    if content_length > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'error': 'File is too large'}), 413
+    
+    # Generate a unique job ID
+    job_id = str(uuid.uuid4())
+    file_path = UPLOAD_PATH_TEMPLATE.format(job_id=job_id, filename=filename)
+    
+    with open(file_path, 'wb') as f:
+        while True:
+            chunk = request.stream.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+    
+    # Get parameters from query string
+    headless, test_mode, limit, resume = parse_job_parameters(request.args)
+    
+    start_job(job_id, filename, file_path, headless, test_mode, limit, resume)
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'results_url': url_for('results', job_id=job_id)
+    })
+
 @app.route('/results/<job_id>')
 def results(job_id):
     """Results page showing progress and final results"""
@@ -181,6 +670,41 @@ def results(job_id):
     
     return render_template('results.html', job=jobs[job_id], now=datetime.now())
 
+def read_checkpoint_progress():
+    """
+    Get the progress summary from the mapper's checkpoint files, parsing them
+    only when they have changed since the last call.
+    
+    Returns:
+        dict: processed_count and timestamp, or None if there is no checkpoint
+    """
+    global checkpoint_progress_cache
+    
+    key = []
+    for path in (mapper.CHECKPOINT_FILE, mapper.CHECKPOINT_LOG_FILE):
+        try:
+            stat = os.stat(path)
+            key.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            key.append(None)
+    key = tuple(key)
+    if key == (None, None):
+        return None
+    
+    cached = checkpoint_progress_cache
+    if cached is not None and cached[0] == key:
+        return dict(cached[1])
+    
+    checkpoint_data = mapper.read_checkpoint()
+    if checkpoint_data is None:
+        return None
+    progress = {
+        'processed_count': len(checkpoint_data.get('processed_pans', [])),
+        'timestamp': checkpoint_data.get('timestamp')
+    }
+    checkpoint_progress_cache = (key, progress)
+    return dict(progress)
+
 @app.route('/job_status/<job_id>')
 def job_status(job_id):
     """API endpoint to get job status"""
@@ -191,26 +715,153 @@ def job_status(job_id):
     if jobs[job_id]['status'] == 'processing':
         # Try to get progress from checkpoint file
         try:
-            if os.path.exists(mapper.CHECKPOINT_FILE):
-                with open(mapper.CHECKPOINT_FILE, 'r') as f:
-                    checkpoint_data = json.load(f)
-                    processed_count = len(checkpoint_data.get('processed_pans', []))
-                    jobs[job_id]['progress'] = {
-                        'processed_count': processed_count,
-                        'timestamp': checkpoint_data.get('timestamp')
-                    }
+            progress = read_checkpoint_progress()
+            if progress is not None:
+                jobs[job_id]['progress'] = progress
         except Exception as e:
             logger.error(f"Error reading checkpoint file: {e}")
     
-    return jsonify(jobs[job_id])
+    return app.response_class(job_status_json(job_id), mimetype='application/json')
+
+def select_simplified_columns(columns):
+    """
+    Pick the columns to keep in the simplified download.
+    
+    Args:
+        columns: Column names available in the GSTIN data
+        
+    Returns:
+        list: Columns to keep, or None to keep all columns
+    """
+    available = frozenset(columns)
+    present = [col for col in SIMPLIFIED_COLUMNS if col in available]
+    if "PAN_Reference" not in available or "GSTIN" not in available:
+        logger.warning(f"Required columns not found, keeping all columns")
+        return None
+    
+    if "GSTIN Status" in available:
+        logger.info(f"Filtered to keep PAN_Reference, GSTIN, and GSTIN Status columns")
+    else:
+        logger.info(f"GSTIN Status column not found, keeping only PAN_Reference and GSTIN columns")
+    return present
+
+def read_gstin_sheet(file_path):
+    """
+    Read the GSTIN sheet of a result workbook, loading only the simplified columns
+    when they are present.
+    
+    Args:
+        file_path: Path to the Excel file
+        
+    Returns:
+        DataFrame: GSTIN data
+    """
+    gstin_df = pd.read_excel(file_path, sheet_name=mapper.GSTIN_SHEET_NAME, engine=EXCEL_READ_ENGINE,
+                             usecols=lambda col: col in SIMPLIFIED_COLUMN_SET)
+    available = frozenset(gstin_df.columns)
+    if "PAN_Reference" not in available or "GSTIN" not in available:
+        # Required columns are missing, so the whole sheet is needed
+        gstin_df = pd.read_excel(file_path, sheet_name=mapper.GSTIN_SHEET_NAME, engine=EXCEL_READ_ENGINE)
+    return gstin_df
+
+def csv_header_bytes(names):
+    """Render a CSV header row, quoting only the names that need it"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(names)
+    return buffer.getvalue().encode('utf-8')
+
+def arrow_needs_quoting(data):
+    """Check whether any string value in a pyarrow Table or RecordBatch contains a delimiter, quote or line break"""
+    return any(
+        pc.any(pc.match_substring_regex(column, CSV_STRUCTURAL_PATTERN)).as_py()
+        for column in data.columns
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+    )
+
+def arrow_csv_write_options(needs_quoting):
+    """
+    Pick pyarrow CSV write options for the rows of one output file, without the header.
+    pyarrow's 'needed' quoting style still quotes every string, so fields are left
+    unquoted unless some value anywhere in the output needs quotes; the choice is made
+    once per file so all its rows are quoted the same way.
+    
+    Args:
+        needs_quoting: Whether any value in the whole output needs quotes
+        
+    Returns:
+        pyarrow.csv.WriteOptions: Options for writing every row of the output
+    """
+    return pa_csv.WriteOptions(include_header=False, quoting_style='needed' if needs_quoting else 'none')
+
+def write_simplified_csv_with_arrow(original_file_path, sink):
+    """
+    Project a CSV file down to the simplified columns using pyarrow, streaming it
+    batch by batch so memory use does not grow with the file size.
+    
+    Args:
+        original_file_path: Path to the source CSV file
+        sink: Binary file object to write the CSV to
+    """
+    with open(original_file_path, newline='') as f:
+        header = next(csv.reader(f), [])
+    
+    keep_columns = select_simplified_columns(header) or header
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=keep_columns,
+        column_types={col: pa.string() for col in keep_columns}
+    )
+    # A first streaming pass decides the quoting for the whole file before any row is written
+    needs_quoting = any(
+        arrow_needs_quoting(batch)
+        for batch in pa_csv.open_csv(original_file_path, convert_options=convert_options)
+    )
+    write_options = arrow_csv_write_options(needs_quoting)
+    
+    reader = pa_csv.open_csv(original_file_path, convert_options=convert_options)
+    row_count = 0
+    sink.write(csv_header_bytes(reader.schema.names))
+    for batch in reader:
+        pa_csv.write_csv(batch, sink, write_options=write_options)
+        row_count += batch.num_rows
+    logger.info(f"Copied {row_count} rows from CSV file")
+
+def write_simplified_csv(simplified_df, sink):
+    """
+    Write the simplified data to CSV, using pyarrow's vectorized writer when available.
+    
+    Args:
+        simplified_df: DataFrame with the columns to keep
+        sink: Binary file object to write the CSV to
+    """
+    if pa_csv is not None:
+        try:
+            table = pa.Table.from_pandas(simplified_df, preserve_index=False)
+            sink.write(csv_header_bytes(table.schema.names))
+            pa_csv.write_csv(table, sink, write_options=arrow_csv_write_options(arrow_needs_quoting(table)))
+            return
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            # Columns mixing numbers and text can't be converted to Arrow
+            logger.warning(f"Falling back to pandas CSV writer: {e}")
+    
+    text_sink = io.TextIOWrapper(sink, encoding='utf-8', newline='')
+    simplified_df.to_csv(text_sink, index=False)
+    # Flush without closing the underlying file, which the caller owns
+    text_sink.detach()
+
+def open_simplified_sink(simplified_path, compress):
+    """Open the simplified CSV for writing, gzip-compressing it on the way when asked"""
+    if compress:
+        return gzip.open(simplified_path, 'wb', compresslevel=DOWNLOAD_GZIP_LEVEL)
+    return open(simplified_path, 'wb')
 
-def prepare_gstin_only_file(original_file_path):
+def prepare_gstin_only_file(original_file_path, compress=False):
     """
     Create a new Excel or CSV file with PAN_Reference, GSTIN, and GSTIN Status columns
     from the GSTIN sheet of the original file.
     
     Args:
         original_file_path: Path to the original Excel file with both sheets
+        compress: Write the CSV gzip-compressed, as it is built, for a compressed download
         
     Returns:
         str: Path to the new file with PAN_Reference, GSTIN, and GSTIN Status columns
@@ -219,59 +870,62 @@ def prepare_gstin_only_file(original_file_path):
         logger.info(f"Preparing simplified GSTIN file from {original_file_path}")
         
         # Check if the file exists
-        if not os.path.exists(original_file_path):
+        original_path = Path(original_file_path)
+        if not original_path.is_file():
             logger.error(f"Original file not found: {original_file_path}")
             return None
             
         # Check if it's a CSV file
-        file_ext = os.path.splitext(original_file_path)[1].lower()
-        is_csv = file_ext == '.csv'
+        is_csv = original_path.suffix.lower() == '.csv'
         
-        # Read the GSTIN data
-        try:
-            if is_csv:
-                gstin_df = pd.read_csv(original_file_path)
-                logger.info(f"Read CSV file with {len(gstin_df)} rows")
-            else:
-                gstin_df = pd.read_excel(original_file_path, sheet_name=mapper.GSTIN_SHEET_NAME, engine='openpyxl')
-                logger.info(f"Read GSTIN sheet with {len(gstin_df)} rows")
-        except Exception as e:
-            logger.error(f"Error reading GSTIN data: {e}")
-            return None
-        
-        # Filter to keep PAN_Reference, GSTIN, and GSTIN Status columns
-        if "PAN_Reference" in gstin_df.columns and "GSTIN" in gstin_df.columns and "GSTIN Status" in gstin_df.columns:
-            simplified_df = gstin_df[["PAN_Reference", "GSTIN", "GSTIN Status"]]
-            logger.info(f"Filtered to keep PAN_Reference, GSTIN, and GSTIN Status columns")
-        elif "PAN_Reference" in gstin_df.columns and "GSTIN" in gstin_df.columns:
-            simplified_df = gstin_df[["PAN_Reference", "GSTIN"]]
-            logger.info(f"GSTIN Status column not found, keeping only PAN_Reference and GSTIN columns")
-        else:
-            logger.warning(f"Required columns not found, keeping all columns")
-            simplified_df = gstin_df
-            
         # Create a temporary file for the simplified data
-        temp_dir = os.path.join(app.config['RESULTS_FOLDER'], 'temp')
-        os.makedirs(temp_dir, exist_ok=True, mode=0o777)  # Add mode parameter for full permissions
+        os.makedirs(SIMPLIFIED_TEMP_DIR, exist_ok=True, mode=0o777)  # Add mode parameter for full permissions
         
-        # Generate a unique filename
-        filename = os.path.basename(original_file_path)
-        base_name = os.path.splitext(filename)[0]
+        # Save as CSV by default for simplicity, under a unique filename
+        simplified_path = os.path.join(
+            SIMPLIFIED_TEMP_DIR,
+            f"{original_path.stem}_simplified_{uuid.uuid4().hex}.csv{'.gz' if compress else ''}"
+        )
         
-        # Save as CSV by default for simplicity
-        simplified_path = os.path.abspath(os.path.join(temp_dir, f"{base_name}_simplified_{int(time.time())}.csv"))
+        if is_csv and pa_csv is not None:
+            # Fast path: project the columns with pyarrow and write straight back to CSV
+            try:
+                with open_simplified_sink(simplified_path, compress) as sink:
+                    write_simplified_csv_with_arrow(original_file_path, sink)
+            except Exception as e:
+                logger.error(f"Error reading GSTIN data: {e}")
+                remove_temp_file(simplified_path)
+                return None
+        else:
+            # Read the GSTIN data
+            try:
+                if is_csv:
+                    gstin_df = pd.read_csv(original_file_path)
+                    logger.info(f"Read CSV file with {len(gstin_df)} rows")
+                else:
+                    gstin_df = read_gstin_sheet(original_file_path)
+                    logger.info(f"Read GSTIN sheet with {len(gstin_df)} rows")
+            except Exception as e:
+                logger.error(f"Error reading GSTIN data: {e}")
+                return None
+            
+            # Filter to keep PAN_Reference, GSTIN, and GSTIN Status columns
+            keep_columns = select_simplified_columns(gstin_df.columns)
+            simplified_df = gstin_df[keep_columns] if keep_columns else gstin_df
+            
+            # Save the simplified data
+            with open_simplified_sink(simplified_path, compress) as sink:
+                write_simplified_csv(simplified_df, sink)
         
-        # Save the simplified data
-        simplified_df.to_csv(simplified_path, index=False)
         logger.info(f"Created simplified file at {simplified_path}")
         
         # Check if the file was created and has content
-        if os.path.exists(simplified_path):
-            file_size = os.path.getsize(simplified_path)
+        try:
+            file_size = os.stat(simplified_path).st_size
             logger.info(f"Created file size: {file_size} bytes")
             if file_size == 0:
                 logger.warning("Warning: Created file is empty!")
-        else:
+        except FileNotFoundError:
             logger.error(f"Error: File was not created at {simplified_path}")
         
         return simplified_path
@@ -280,6 +934,15 @@ def prepare_gstin_only_file(original_file_path):
         logger.error(f"Error preparing GSTIN-only file: {e}")
         return None
 
+def remove_temp_file(file_path):
+    """Delete a generated download file, ignoring one that is already gone"""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Error removing temporary file {file_path}: {e}")
+
 @app.route('/download/<job_id>')
 def download_results(job_id):
     """Download the results file with only the GSTIN sheet"""
@@ -289,8 +952,10 @@ def download_results(job_id):
     
     original_file = jobs[job_id]['result_file']
     
-    # Prepare a file with only the GSTIN sheet
-    gstin_only_file = prepare_gstin_only_file(original_file)
+    # Prepare a file with only the GSTIN sheet, compressed while it is written when
+    # the client accepts gzip
+    compress = bool(request.accept_encodings['gzip'])
+    gstin_only_file = prepare_gstin_only_file(original_file, compress=compress)
     
     if gstin_only_file:
         # Get the original filename but add "_simplified" before the extension
@@ -298,11 +963,24 @@ def download_results(job_id):
         base_name = os.path.splitext(original_filename)[0]
         download_filename = f"{base_name}_simplified.csv"
         
-        return send_file(gstin_only_file, as_attachment=True, download_name=download_filename)
+        # The file is generated for this request, so it is unlinked as soon as it is
+        # open: the open handle keeps it readable until the response is sent, and the
+        # server can still stream it with wsgi.file_wrapper. Being sent from a handle,
+        # it never goes through X-Sendfile and has no conditional/range support.
+        download_file = open(gstin_only_file, 'rb')
+        file_size = os.fstat(download_file.fileno()).st_size
+        remove_temp_file(gstin_only_file)
+        response = send_file(download_file, mimetype='text/csv', as_attachment=True,
+                             download_name=download_filename, conditional=False)
+        response.content_length = file_size
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
     else:
         # Fall back to the original file if there was an error
         logger.warning(f"Falling back to original file for download: {original_file}")
-        return send_file(original_file, as_attachment=True)
+        return send_file(original_file, as_attachment=True, conditional=True)
 
 @app.route('/history')
 def history():
@@ -318,8 +996,7 @@ def clear_job(job_id):
         # if 'file_path' in jobs[job_id] and os.path.exists(jobs[job_id]['file_path']):
         #     os.remove(jobs[job_id]['file_path'])
         
-        del jobs[job_id]
-        save_jobs_to_file()
+        delete_job(job_id)
         flash('Job removed from history')
     
     return redirect(url_for('history'))
@@ -331,7 +1008,7 @@ def gstin_details(gstin):
         logger.info(f"Received request for GSTIN details: {gstin}")
         
         # Validate GSTIN format
-        if not gstin or len(gstin) != 15:
+        if not is_valid_gstin(gstin):
             logger.error(f"Invalid GSTIN format: {gstin}")
             return jsonify({
                 'error': 'Invalid GSTIN format',
@@ -339,19 +1016,15 @@ def gstin_details(gstin):
             }), 400
         
         # Get GSTIN details using the enhanced mapper
-        details = mapper.get_gstin_details(gstin)
+        details, _ = get_gstin_details_cached(gstin)
         
         # Check if there was an error
         if 'error' in details:
             logger.error(f"Error getting GSTIN details: {details['error']}")
             return jsonify(details), 404 if details['error'] == 'No records found' else 500
         
-        # Find the most recent Excel file to update
-        excel_file = None
-        for job_id, job in jobs.items():
-            if job['status'] == 'completed' and 'result_file' in job:
-                if excel_file is None or os.path.getmtime(job['result_file']) > os.path.getmtime(excel_file):
-                    excel_file = job['result_file']
+        # Use the most recent Excel file to update
+        excel_file = latest_result_file
         
         # Update Excel file with GSTIN details if a file was found
         if excel_file and os.path.exists(excel_file):
@@ -399,7 +1072,7 @@ def update_gstin_details():
         valid_gstins = []
         invalid_gstins = []
         for gstin in gstins:
-            if gstin and len(gstin) == 15:
+            if is_valid_gstin(gstin):
                 valid_gstins.append(gstin)
             else:
                 invalid_gstins.append(gstin)
@@ -410,12 +1083,8 @@ def update_gstin_details():
                 'invalid_gstins': invalid_gstins
             }), 400
             
-        # Find the most recent Excel file to update
-        excel_file = None
-        for job_id, job in jobs.items():
-            if job['status'] == 'completed' and 'result_file' in job:
-                if excel_file is None or os.path.getmtime(job['result_file']) > os.path.getmtime(excel_file):
-                    excel_file = job['result_file']
+        # Use the most recent Excel file to update
+        excel_file = latest_result_file
         
         if not excel_file or not os.path.exists(excel_file):
             return jsonify({
@@ -430,8 +1099,8 @@ def update_gstin_details():
             'id': job_id,
             'type': 'batch_gstin_update',
             'status': 'processing',
-            'created_at': datetime.now().isoformat(),
-            'start_time': datetime.now().isoformat(),
+            'created_at': time.time_ns(),
+            'start_time': time.time_ns(),
             'gstins': valid_gstins,
             'excel_file': excel_file,
             'progress': {
@@ -442,15 +1111,10 @@ def update_gstin_details():
             },
             'results': []
         }
-        save_jobs_to_file()
+        save_job(job_id)
         
         # Start processing in background
-        thread = threading.Thread(
-            target=process_batch_gstin_update,
-            args=(job_id, valid_gstins, excel_file)
-        )
-        thread.daemon = True
-        thread.start()
+        run_in_background(process_batch_gstin_update, job_id, valid_gstins, excel_file)
         
         return jsonify({
             'job_id': job_id,
@@ -468,78 +1132,91 @@ def update_gstin_details():
 
 def process_batch_gstin_update(job_id, gstins, excel_file):
     """Process batch GSTIN update in background"""
+    job = jobs[job_id]
+    progress_lock = threading.Lock()
+    fetched = []
+    # Each lookup thread keeps one browser for all its GSTINs, closed when the batch ends
+    browsers = mapper.GstinBrowsers()
+    
+    def record_result(result, count_processed=True):
+        """Update progress and save it after each GSTIN"""
+        with progress_lock:
+            if count_processed:
+                job['progress']['processed'] += 1
+            job['progress']['successful' if result['success'] else 'failed'] += 1
+            add_job_result(job_id, result)
+            save_job(job_id)
+    
+    def process_gstin(gstin):
+        """Get the details for one GSTIN; successful lookups are written to Excel after the batch"""
+        try:
+            # Get GSTIN details
+            logger.info(f"Processing GSTIN: {gstin}")
+            details, _ = get_gstin_details_cached(gstin, rate_limiter=portal_rate_limiter, browsers=browsers)
+            
+            # Check if there was an error
+            if 'error' in details:
+                logger.warning(f"Error getting details for GSTIN {gstin}: {details['error']}")
+                record_result({
+                    'gstin': gstin,
+                    'success': False,
+                    'error': details['error']
+                })
+                return
+            
+            with progress_lock:
+                fetched.append((gstin, details))
+                job['progress']['processed'] += 1
+                save_job(job_id)
+        except Exception as e:
+            logger.error(f"Error processing GSTIN {gstin}: {e}")
+            record_result({
+                'gstin': gstin,
+                'success': False,
+                'error': str(e)
+            })
+    
     try:
         logger.info(f"Starting batch GSTIN update for job {job_id} with {len(gstins)} GSTINs")
         
-        for i, gstin in enumerate(gstins):
-            try:
-                # Update progress
-                jobs[job_id]['progress']['processed'] = i + 1
-                
-                # Get GSTIN details
-                logger.info(f"Processing GSTIN {i+1}/{len(gstins)}: {gstin}")
-                details = mapper.get_gstin_details(gstin)
-                
-                # Check if there was an error
-                if 'error' in details:
-                    logger.warning(f"Error getting details for GSTIN {gstin}: {details['error']}")
-                    jobs[job_id]['progress']['failed'] += 1
-                    jobs[job_id]['results'].append({
-                        'gstin': gstin,
-                        'success': False,
-                        'error': details['error']
-                    })
-                    continue
-                
-                # Update Excel file with GSTIN details
-                update_success = mapper.update_excel_with_gstin_details(excel_file, gstin, details)
-                
-                if update_success:
-                    logger.info(f"Successfully updated Excel file with details for GSTIN {gstin}")
-                    jobs[job_id]['progress']['successful'] += 1
-                    jobs[job_id]['results'].append({
-                        'gstin': gstin,
-                        'success': True,
-                        'details': details
-                    })
-                else:
-                    logger.warning(f"Failed to update Excel file with details for GSTIN {gstin}")
-                    jobs[job_id]['progress']['failed'] += 1
-                    jobs[job_id]['results'].append({
-                        'gstin': gstin,
-                        'success': False,
-                        'error': 'Failed to update Excel file'
-                    })
-                
-                # Save jobs to file after each GSTIN
-                save_jobs_to_file()
-                
-                # Add a small delay to avoid overwhelming the GST portal
-                time.sleep(random.uniform(1, 3))  # Using random module for delay
-                
-            except Exception as e:
-                logger.error(f"Error processing GSTIN {gstin}: {e}")
-                jobs[job_id]['progress']['failed'] += 1
-                jobs[job_id]['results'].append({
+        # Overlap the lookups; the shared rate limiter keeps the portal request rate down
+        try:
+            with ThreadPoolExecutor(max_workers=BATCH_UPDATE_WORKERS) as executor:
+                list(executor.map(process_gstin, gstins))
+        finally:
+            browsers.close()
+        
+        # Write all fetched details to the Excel file in one pass
+        updated = mapper.update_excel_with_gstin_details_bulk(excel_file, fetched) if fetched else set()
+        for gstin, details in fetched:
+            if gstin in updated:
+                result = {
+                    'gstin': gstin,
+                    'success': True,
+                    'details': details
+                }
+            else:
+                logger.warning(f"Failed to update Excel file with details for GSTIN {gstin}")
+                result = {
                     'gstin': gstin,
                     'success': False,
-                    'error': str(e)
-                })
-                save_jobs_to_file()
+                    'error': 'Failed to update Excel file'
+                }
+            record_result(result, count_processed=False)
         
         # Update job status
-        jobs[job_id]['status'] = 'completed'
-        jobs[job_id]['end_time'] = datetime.now().isoformat()
-        save_jobs_to_file()
+        job['status'] = 'completed'
+        job['end_time'] = time.time_ns()
+        save_job(job_id)
         
         logger.info(f"Completed batch GSTIN update for job {job_id}")
         
     except Exception as e:
         logger.error(f"Error in batch GSTIN update for job {job_id}: {e}")
-        jobs[job_id]['status'] = 'failed'
-        jobs[job_id]['error'] = str(e)
-        jobs[job_id]['end_time'] = datetime.now().isoformat()
-        save_jobs_to_file()
+        job['status'] = 'failed'
+        job['error'] = str(e)
+        job['end_time'] = time.time_ns()
+        save_job(job_id)
 
 @app.route('/batch_update_status/<job_id>')
 def batch_update_status(job_id):
@@ -549,18 +1226,14 @@ def batch_update_status(job_id):
     
     return jsonify(jobs[job_id]['batch_update'])
 
+# Open the jobs database and load existing jobs data; this runs on import so it
+# also happens when the app is served by gunicorn (see gunicorn.conf.py)
+init_jobs_db()
+load_jobs()
+os.makedirs('screenshots', exist_ok=True)
+
 if __name__ == '__main__':
-    # Load existing jobs data
-    load_jobs_from_file()
-    
-    # Create necessary directories
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    os.makedirs(RESULTS_FOLDER, exist_ok=True)
-    os.makedirs('screenshots', exist_ok=True)
-    
-    # Determine if running in Docker
-    in_docker = os.environ.get('DOCKER_CONTAINER', False)
-    
+    # Development server only; use gunicorn -c gunicorn.conf.py app:app in production
     # Running on 0.0.0.0 allows it to be accessible from outside the container
     # The port is set to 8001 to match the Nginx proxy_pass configuration
-    app.run(host='0.0.0.0', port=8001)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=8001, threaded=True)
@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration for the PAN-GSTIN Mapper web application.
+
+Start the application with:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+# Listen on the port the container exposes
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+# Job state, the job queue and the background mapping threads live in the app
+# process, so a single worker process serves all requests; threads let status
+# polls, downloads and uploads run concurrently instead of queueing behind each other
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Uploads of large files over slow connections can take a while
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
@@ -26,6 +26,8 @@ Steps:
 # File paths and directories
 SCREENSHOT_DIR = "screenshots"
 CHECKPOINT_FILE = "pan_gstin_checkpoint.json"
+CHECKPOINT_LOG_FILE = "pan_gstin_checkpoint.ndjson"  # Appended to between full checkpoint snapshots
+PAN_CACHE_DB = "pan_cache.db"  # Search results by PAN, reused across runs
 
 # URLs and endpoints
 GST_PORTAL_URL = "https://services.gst.gov.in/services/searchtpbypan"
@@ -47,6 +49,16 @@ TRUECAPTCHA_ACCOUNTS = [
 PAN_SHEET_NAME = "PAN_Data"
 GSTIN_SHEET_NAME = "GSTIN_Data"
 
+# Write workbooks with PyExcelerate (if installed) instead of openpyxl; much faster on
+# large sheets, but date cells are written without a date format
+USE_PYEXCELERATE = False
+
+# Format of a valid PAN: five letters, four digits, one letter
+PAN_PATTERN = r'^[A-Z]{5}[0-9]{4}[A-Z]$'
+
+# Format of a valid GSTIN: state code, the holder's PAN, then three registration characters
+GSTIN_PATTERN = r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][0-9A-Z]{3}$'
+
 # PAN sheet columns
 PAN_SHEET_COLUMNS = [
     "PAN", 
@@ -70,9 +82,15 @@ GSTIN_SHEET_COLUMNS = [
     "HSN_Codes",
     "Last_Updated"
 ]
+
+# Identifier columns read as text so they are never parsed as numbers; the other
+# columns keep pandas' type inference
+PAN_SHEET_DTYPES = {"PAN": str}
+GSTIN_SHEET_DTYPES = {"PAN_Reference": str, "GSTIN": str}
 # ===== END CONFIGURATION SECTION =====
 
 import pandas as pd
+import numpy as np
 import time
 import os
 import random
@@ -85,6 +103,15 @@ import io
 import argparse
 import json
 import datetime
+import shutil
+import hashlib
+import sqlite3
+import struct
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+import openpyxl
 from PIL import Image
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -95,6 +122,18 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
+# Optional faster xlsx writer
+try:
+    from pyexcelerate import Workbook as FastWorkbook
+except ImportError:
+    FastWorkbook = None
+
+# Optional faster JSON encoder for checkpoints
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -107,8 +146,80 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Global variables
+PAN_RE = re.compile(PAN_PATTERN)
+GSTIN_RE = re.compile(GSTIN_PATTERN)
+NON_DIGIT_RE = re.compile(r'[^0-9]')
+
 # ===== EXCEL HANDLING FUNCTIONS =====
 
+def normalize_pans(values):
+    """
+    Normalize a column of PAN values and check their format in one vectorized pass.
+    
+    Args:
+        values: Series of PAN values as read from the sheet
+        
+    Returns:
+        tuple: (Series of stripped upper-case PANs, boolean Series marking the valid ones)
+    """
+    pans = values.astype(str).str.strip().str.upper()
+    valid = values.notna() & pans.str.match(PAN_RE)
+    return pans, valid
+
+
+def find_column(columns, keyword, aliases=()):
+    """
+    Find a column by name, ignoring case.
+    
+    Args:
+        columns: Column names to search, in order
+        keyword: Upper-case text the column name should contain
+        aliases: Other upper-case column names to accept
+        
+    Returns:
+        The first matching column name, or None if no column matches
+    """
+    for col in columns:
+        name = str(col).upper()
+        if keyword in name or name in aliases:
+            return col
+    return None
+
+
+def write_two_sheets(file_path, pan_df, gstin_df):
+    """
+    Write the PAN and GSTIN DataFrames to an Excel file. Uses PyExcelerate when it is
+    installed and enabled, otherwise openpyxl's write-only mode; both stream rows to
+    disk instead of building every cell in memory.
+    
+    Args:
+        file_path: Path to the Excel file
+        pan_df: DataFrame for the PAN sheet
+        gstin_df: DataFrame for the GSTIN sheet
+    """
+    sheets = []
+    for sheet_name, df in ((PAN_SHEET_NAME, pan_df), (GSTIN_SHEET_NAME, gstin_df)):
+        # Empty cells are NaN in pandas and None in the writers
+        values = df.to_numpy(dtype=object)
+        values[pd.isna(values)] = None
+        sheets.append((sheet_name, [str(col) for col in df.columns], values.tolist()))
+    
+    if USE_PYEXCELERATE and FastWorkbook is not None:
+        workbook = FastWorkbook()
+        for sheet_name, header, rows in sheets:
+            workbook.new_sheet(sheet_name, data=[header] + rows)
+        workbook.save(file_path)
+        return
+    
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_name, header, rows in sheets:
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(file_path)
+
+
 def validate_excel_structure(file_path):
     """
     Validate the Excel file structure and create necessary sheets if they don't exist.
@@ -141,7 +252,7 @@ def validate_excel_structure(file_path):
             
         # Try to read the file
         try:
-            # Check if the file has the required sheets
+            # Open the workbook once; the sheets below are parsed from it
             excel_file = pd.ExcelFile(file_path)
             sheet_names = excel_file.sheet_names
             
@@ -152,88 +263,79 @@ def validate_excel_structure(file_path):
                 logger.info(f"Detected old format Excel file. Converting to new two-sheet format...")
                 
                 # Read the old format data (assuming it's in the first sheet)
-                old_df = pd.read_excel(file_path, sheet_name=0, engine='openpyxl')
+                old_df = excel_file.parse(0)
+                excel_file.close()
                 logger.info(f"Read old format data with {len(old_df)} rows")
                 
                 # Check if the old format has a PAN column (case-insensitive)
-                pan_column = None
-                for col in old_df.columns:
-                    if col.upper() == "PAN" or "PAN" in col.upper() or col.upper() in ["PAN_NUMBER", "PANNUMBER", "PAN_NO", "PANNO"]:
-                        pan_column = col
-                        logger.info(f"Found PAN column in old format: '{pan_column}'")
-                        break
+                pan_column = find_column(old_df.columns, "PAN")
                 
                 if pan_column is None:
                     return False, "Could not find PAN column in the old format file", None, None
+                logger.info(f"Found PAN column in old format: '{pan_column}'")
                 
-                # Create new DataFrames for the two-sheet structure
-                pan_df = pd.DataFrame(columns=PAN_SHEET_COLUMNS)
-                gstin_df = pd.DataFrame(columns=GSTIN_SHEET_COLUMNS)
+                # Collect the rows for the two-sheet structure and build each DataFrame once
+                records = old_df.to_dict('records')
+                pan_rows = []
+                gstin_rows = []
+                
+                # Copy other relevant columns if they exist
+                extra_columns = {}
+                for col in ["Name", "Email", "Phone", "Address"]:
+                    for source in (col, col.lower(), col.upper()):
+                        if source in old_df.columns:
+                            extra_columns[col] = source
+                            break
                 
                 # Extract unique PAN entries for the PAN_Data sheet
-                unique_pans = {}
-                for i, row in old_df.iterrows():
-                    pan = row[pan_column]
-                    if pd.notna(pan):
-                        pan = str(pan).strip().upper()
-                        if len(pan) == 10 and pan[:5].isalpha() and pan[5:9].isdigit() and pan[9].isalpha():
-                            if pan not in unique_pans:
-                                new_row = {col: "" for col in PAN_SHEET_COLUMNS}
-                                new_row["PAN"] = pan
-                                
-                                # Copy other relevant columns if they exist
-                                for col in ["Name", "Email", "Phone", "Address"]:
-                                    if col in old_df.columns:
-                                        new_row[col] = row[col]
-                                    elif col.lower() in old_df.columns:
-                                        new_row[col] = row[col.lower()]
-                                    elif col.upper() in old_df.columns:
-                                        new_row[col] = row[col.upper()]
-                                
-                                unique_pans[pan] = len(pan_df)
-                                pan_df = pd.concat([pan_df, pd.DataFrame([new_row])], ignore_index=True)
+                unique_pans = set()
+                pans, valid = normalize_pans(old_df[pan_column])
+                for row, pan, is_valid in zip(records, pans, valid):
+                    if is_valid and pan not in unique_pans:
+                        new_row = {col: "" for col in PAN_SHEET_COLUMNS}
+                        new_row["PAN"] = pan
+                        for col, source in extra_columns.items():
+                            new_row[col] = row[source]
+                        
+                        unique_pans.add(pan)
+                        pan_rows.append(new_row)
                 
                 # Extract GSTIN entries for the GSTIN_Data sheet
-                gstin_column = None
-                for col in old_df.columns:
-                    if col.upper() == "GSTIN" or "GSTIN" in col.upper() or col.upper() in ["GST", "GST_NUMBER", "GSTNUMBER", "GST_NO", "GSTNO"]:
-                        gstin_column = col
-                        logger.info(f"Found GSTIN column in old format: '{gstin_column}'")
-                        break
+                gstin_column = find_column(old_df.columns, "GSTIN", ("GST", "GST_NUMBER", "GSTNUMBER", "GST_NO", "GSTNO"))
                 
                 if gstin_column is not None:
-                    for i, row in old_df.iterrows():
-                        pan = row[pan_column] if pd.notna(row[pan_column]) else ""
-                        pan = str(pan).strip().upper()
-                        
+                    logger.info(f"Found GSTIN column in old format: '{gstin_column}'")
+                    current_time = datetime.datetime.now().isoformat()
+                    for row, pan, is_valid in zip(records, pans, valid):
                         gstin = row[gstin_column] if pd.notna(row[gstin_column]) else ""
                         gstin = str(gstin).strip().upper()
                         
-                        if len(pan) == 10 and len(gstin) == 15:
-                            new_row = {
+                        if is_valid and GSTIN_RE.match(gstin):
+                            gstin_rows.append({
                                 "PAN_Reference": pan,
                                 "GSTIN": gstin,
                                 "GSTIN Status": row.get("GSTIN Status", "") if pd.notna(row.get("GSTIN Status", "")) else "",
                                 "State": row.get("State", "") if pd.notna(row.get("State", "")) else "",
-                                "Last_Updated": datetime.datetime.now().isoformat()
-                            }
-                            gstin_df = pd.concat([gstin_df, pd.DataFrame([new_row])], ignore_index=True)
+                                "Last_Updated": current_time
+                            })
+                
+                pan_df = pd.DataFrame(pan_rows, columns=PAN_SHEET_COLUMNS)
+                gstin_df = pd.DataFrame(gstin_rows, columns=GSTIN_SHEET_COLUMNS)
                 
                 logger.info(f"Converted old format to new format: {len(pan_df)} unique PANs and {len(gstin_df)} GSTINs")
                 
                 # Save the new format back to the file
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    pan_df.to_excel(writer, sheet_name=PAN_SHEET_NAME, index=False)
-                    gstin_df.to_excel(writer, sheet_name=GSTIN_SHEET_NAME, index=False)
+                write_two_sheets(file_path, pan_df, gstin_df)
                 
                 logger.info(f"Saved new two-sheet format to {file_path}")
                 
             else:
                 # File already has the required sheets, just read them
-                pan_df = pd.read_excel(file_path, sheet_name=PAN_SHEET_NAME, engine='openpyxl')
+                pan_df = excel_file.parse(PAN_SHEET_NAME, dtype=PAN_SHEET_DTYPES)
                 logger.info(f"Found existing PAN sheet with {len(pan_df)} rows")
                 
-                gstin_df = pd.read_excel(file_path, sheet_name=GSTIN_SHEET_NAME, engine='openpyxl')
+                gstin_df = excel_file.parse(GSTIN_SHEET_NAME, dtype=GSTIN_SHEET_DTYPES)
+                excel_file.close()
                 logger.info(f"Found existing GSTIN sheet with {len(gstin_df)} rows")
             
             # Validate PAN sheet columns
@@ -261,16 +363,12 @@ def validate_excel_structure(file_path):
                 return False, "PAN column is missing in the PAN sheet", pan_df, gstin_df
                 
             # Validate PAN format in PAN sheet
-            invalid_pans = []
-            for i, pan in enumerate(pan_df["PAN"]):
-                if pd.notna(pan):
-                    pan_str = str(pan).strip().upper()
-                    if not (len(pan_str) == 10 and pan_str[:5].isalpha() and pan_str[5:9].isdigit() and pan_str[9].isalpha()):
-                        invalid_pans.append((i, pan_str))
-                        if len(invalid_pans) <= 5:  # Limit logging to first 5 invalid PANs
-                            logger.warning(f"Invalid PAN format at row {i+2}: {pan_str}")
+            pans, valid = normalize_pans(pan_df["PAN"])
+            invalid_pans = pans[pan_df["PAN"].notna() & ~valid]
+            for i, pan_str in invalid_pans.head(5).items():  # Limit logging to first 5 invalid PANs
+                logger.warning(f"Invalid PAN format at row {i+2}: {pan_str}")
                             
-            if invalid_pans:
+            if len(invalid_pans):
                 logger.warning(f"Found {len(invalid_pans)} invalid PAN entries in the PAN sheet")
                 
             return True, "", pan_df, gstin_df
@@ -292,23 +390,66 @@ def extract_pan_data(pan_df):
     Returns:
         tuple: (list of unique PAN numbers, dictionary mapping PAN to row index)
     """
-    # Get PAN numbers
-    pan_numbers = []
-    pan_to_index = {}
-    
-    for i, row in pan_df.iterrows():
-        pan = row["PAN"]
-        if pd.notna(pan):
-            pan = str(pan).strip().upper()
-            if len(pan) == 10 and pan[:5].isalpha() and pan[5:9].isdigit() and pan[9].isalpha():
-                if pan not in pan_to_index:
-                    pan_numbers.append(pan)
-                    pan_to_index[pan] = i
+    # Get the valid PAN numbers, keeping the first row of each
+    pans, valid = normalize_pans(pan_df["PAN"])
+    valid_pans = pans[valid].drop_duplicates()
+    pan_numbers = valid_pans.tolist()
+    pan_to_index = dict(zip(pan_numbers, valid_pans.index.tolist()))
                     
     logger.info(f"Extracted {len(pan_numbers)} unique valid PAN numbers")
     return pan_numbers, pan_to_index
 
 
+def dumps_json_bytes(data):
+    """Serialize data to compact JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def loads_json(data):
+    """Parse JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_checkpoint():
+    """
+    Read the checkpoint snapshot and replay the checkpoint log on top of it.
+    
+    Returns:
+        dict: Checkpoint data, or None if no checkpoint exists
+    """
+    checkpoint_data = None
+    if os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE, 'rb') as f:
+            checkpoint_data = loads_json(f.read())
+    
+    if os.path.exists(CHECKPOINT_LOG_FILE):
+        if checkpoint_data is None:
+            checkpoint_data = {"processed_pans": [], "results": {}}
+        processed_pans = checkpoint_data.setdefault("processed_pans", [])
+        results = checkpoint_data.setdefault("results", {})
+        seen_pans = set(processed_pans)
+        
+        with open(CHECKPOINT_LOG_FILE, 'rb') as f:
+            for line in f:
+                try:
+                    entry = loads_json(line)
+                except ValueError:
+                    # A line cut short by a crash mid-write; skip it, the other lines are intact
+                    continue
+                pan = entry["pan"]
+                if pan not in seen_pans:
+                    seen_pans.add(pan)
+                    processed_pans.append(pan)
+                results[pan] = entry["results"]
+                checkpoint_data["timestamp"] = entry.get("timestamp")
+    
+    return checkpoint_data
+
+
 def load_checkpoint():
     """
     Load checkpoint data from file.
@@ -316,23 +457,25 @@ def load_checkpoint():
     Returns:
         dict: Checkpoint data or empty dict if no checkpoint exists
     """
-    if os.path.exists(CHECKPOINT_FILE):
-        try:
-            with open(CHECKPOINT_FILE, 'r') as f:
-                checkpoint_data = json.load(f)
-                logger.info(f"Loaded checkpoint data for {len(checkpoint_data.get('processed_pans', []))} processed PANs")
-                return checkpoint_data
-        except Exception as e:
-            logger.error(f"Error loading checkpoint file: {e}")
-            return {"processed_pans": [], "results": {}}
-    else:
+    try:
+        checkpoint_data = read_checkpoint()
+    except Exception as e:
+        logger.error(f"Error loading checkpoint file: {e}")
+        return {"processed_pans": [], "results": {}}
+    
+    if checkpoint_data is None:
         logger.info("No checkpoint file found, starting fresh")
         return {"processed_pans": [], "results": {}}
+    
+    logger.info(f"Loaded checkpoint data for {len(checkpoint_data.get('processed_pans', []))} processed PANs")
+    return checkpoint_data
 
 
 def save_checkpoint(processed_pans, results):
     """
-    Save checkpoint data to file.
+    Save a full checkpoint snapshot to file. The snapshot is written to a temporary
+    file and renamed over the old one, so a crash never leaves a partial checkpoint;
+    the checkpoint log is cleared afterwards since the snapshot now covers it.
     
     Args:
         processed_pans: List of processed PAN numbers
@@ -345,14 +488,113 @@ def save_checkpoint(processed_pans, results):
     }
     
     try:
-        with open(CHECKPOINT_FILE, 'w') as f:
-            json.dump(checkpoint_data, f, indent=2)
+        tmp_path = f"{CHECKPOINT_FILE}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(dumps_json_bytes(checkpoint_data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, CHECKPOINT_FILE)
+        
+        if os.path.exists(CHECKPOINT_LOG_FILE):
+            os.remove(CHECKPOINT_LOG_FILE)
         logger.info(f"Saved checkpoint with {len(processed_pans)} processed PANs")
     except Exception as e:
         logger.error(f"Error saving checkpoint file: {e}")
 
 
-def update_excel_with_results(file_path, pan_df, gstin_df, results_dict):
+def append_checkpoint(pans, results):
+    """
+    Append the results of newly processed PANs to the checkpoint log, one JSON line
+    per PAN, instead of rewriting the whole checkpoint. The log is synced to disk
+    before returning, so recorded PANs survive a crash.
+    
+    Args:
+        pans: PAN numbers processed since the last checkpoint
+        results: Dictionary mapping PAN to GSTIN results
+    """
+    timestamp = datetime.datetime.now().isoformat()
+    try:
+        with open(CHECKPOINT_LOG_FILE, 'ab') as f:
+            f.write(b"".join(
+                dumps_json_bytes({"pan": pan, "results": results[pan], "timestamp": timestamp}) + b"\n"
+                for pan in pans
+            ))
+            f.flush()
+            os.fsync(f.fileno())
+        logger.debug(f"Appended {len(pans)} PANs to checkpoint log")
+    except Exception as e:
+        logger.error(f"Error appending to checkpoint log: {e}")
+
+
+def open_pan_cache():
+    """
+    Open the PAN results cache and create its table if it doesn't exist.
+    
+    Returns:
+        sqlite3.Connection: The cache database, or None if it could not be opened
+    """
+    try:
+        cache_db = sqlite3.connect(PAN_CACHE_DB, check_same_thread=False)
+        cache_db.execute("PRAGMA journal_mode=WAL")
+        with cache_db:
+            cache_db.execute("CREATE TABLE IF NOT EXISTS pan_cache (pan TEXT PRIMARY KEY, results TEXT, updated_at INTEGER)")
+        return cache_db
+    except Exception as e:
+        logger.error(f"Error opening PAN cache: {e}")
+        return None
+
+
+def load_cached_results(cache_db, pans):
+    """
+    Look up cached search results for PANs that are younger than PAN_CACHE_TTL.
+    
+    Args:
+        cache_db: The PAN cache database
+        pans: PAN numbers to look up
+        
+    Returns:
+        dict: Mapping of PAN to cached results for the PANs found
+    """
+    cached = {}
+    cutoff = int(time.time()) - PAN_CACHE_TTL
+    try:
+        # SQLite limits the number of parameters in one query, so look PANs up in chunks
+        for start in range(0, len(pans), 500):
+            chunk = pans[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = cache_db.execute(
+                f"SELECT pan, results FROM pan_cache WHERE updated_at >= ? AND pan IN ({placeholders})",
+                [cutoff, *chunk]
+            )
+            for pan, results in rows:
+                cached[pan] = loads_json(results)
+    except Exception as e:
+        logger.error(f"Error reading PAN cache: {e}")
+    return cached
+
+
+def cache_results(cache_db, pan, results):
+    """
+    Store the search results for a PAN in the cache. Failed searches are not cached.
+    
+    Args:
+        cache_db: The PAN cache database
+        pan: The PAN number
+        results: List of results for the PAN
+    """
+    if any("Error" in str(r.get("Result", "")) for r in results):
+        return
+    try:
+        with cache_db:
+            cache_db.execute(
+                "INSERT OR REPLACE INTO pan_cache (pan, results, updated_at) VALUES (?, ?, ?)",
+                (pan, dumps_json_bytes(results).decode(), int(time.time()))
+            )
+    except Exception as e:
+        logger.error(f"Error caching results for PAN {pan}: {e}")
+
+
+def update_excel_with_results(file_path, pan_df, gstin_df, results_dict, seen_gstins=None):
     """
     Update the Excel file with results using the two-sheet approach.
     
@@ -361,52 +603,72 @@ def update_excel_with_results(file_path, pan_df, gstin_df, results_dict):
         pan_df: DataFrame for the PAN sheet
         gstin_df: DataFrame for the GSTIN sheet
         results_dict: Dictionary mapping PAN to GSTIN results
+        seen_gstins: Set of the GSTINs already in gstin_df, kept by the caller across calls
+                     so it doesn't have to be rebuilt each time; updated once the file is saved
         
     Returns:
         tuple: (updated pan_df, updated gstin_df)
     """
     try:
-        # Create a backup of the file first
-        backup_path = f"{os.path.splitext(file_path)[0]}_backup{os.path.splitext(file_path)[1]}"
-        with pd.ExcelWriter(backup_path, engine='openpyxl') as writer:
-            pan_df.to_excel(writer, sheet_name=PAN_SHEET_NAME, index=False)
-            gstin_df.to_excel(writer, sheet_name=GSTIN_SHEET_NAME, index=False)
-        logger.info(f"Created backup of file at {backup_path}")
+        # Create a backup of the file first by copying it as it is on disk
+        if os.path.exists(file_path):
+            backup_path = f"{os.path.splitext(file_path)[0]}_backup{os.path.splitext(file_path)[1]}"
+            shutil.copy2(file_path, backup_path)
+            logger.info(f"Created backup of file at {backup_path}")
         
         # Get current timestamp
         current_time = datetime.datetime.now().isoformat()
         
-        # Update PAN sheet with GSTIN counts
+        # Map each PAN to its first row once, instead of scanning the column per PAN
+        first_pan_rows = pan_df["PAN"].drop_duplicates()
+        pan_to_row = dict(zip(first_pan_rows.values, first_pan_rows.index))
+        
+        # Work out the GSTIN count and status for each PAN
+        pan_rows = []
+        gstin_counts = []
+        statuses = []
         for pan, results in results_dict.items():
             # Find the row index for this PAN
-            pan_rows = pan_df[pan_df["PAN"] == pan].index.tolist()
-            if pan_rows:
-                row_idx = pan_rows[0]
-                
+            row_idx = pan_to_row.get(pan)
+            if row_idx is not None:
                 # Count valid GSTINs
                 gstin_count = sum(1 for r in results if "GSTIN" in r and len(r["GSTIN"]) == 15)
                 
-                # Update the PAN sheet
-                pan_df.at[row_idx, "GSTIN_Count"] = gstin_count
-                pan_df.at[row_idx, "Last_Updated"] = current_time
-                
                 if gstin_count > 0:
-                    pan_df.at[row_idx, "Status"] = "Success"
+                    status = "Success"
                 elif "No records found" in str(results):
-                    pan_df.at[row_idx, "Status"] = "No GSTINs found"
+                    status = "No GSTINs found"
                 elif any("Error" in str(r.get("Result", "")) for r in results):
-                    error_msg = next((r.get("Result", "") for r in results if "Error" in str(r.get("Result", ""))), "Error")
-                    pan_df.at[row_idx, "Status"] = error_msg
+                    status = next((r.get("Result", "") for r in results if "Error" in str(r.get("Result", ""))), "Error")
                 else:
-                    pan_df.at[row_idx, "Status"] = "Unknown"
-                    
+                    status = "Unknown"
+                
+                pan_rows.append(row_idx)
+                gstin_counts.append(gstin_count)
+                statuses.append(status)
                 logger.info(f"Updated PAN sheet for {pan} with {gstin_count} GSTINs")
         
-        # Add new rows to GSTIN sheet
+        # Update the PAN sheet with one assignment per column
+        if pan_rows:
+            for col in ("Last_Updated", "Status"):
+                pan_df[col] = pan_df[col].astype(object)
+            pan_df.loc[pan_rows, "GSTIN_Count"] = gstin_counts
+            pan_df.loc[pan_rows, "Last_Updated"] = current_time
+            pan_df.loc[pan_rows, "Status"] = statuses
+        
+        if seen_gstins is None:
+            seen_gstins = set(gstin_df["GSTIN"].dropna().astype(str))
+        
+        # Add new rows to GSTIN sheet, skipping GSTINs that are already there
         new_gstin_rows = []
+        new_gstins = set()
         for pan, results in results_dict.items():
             for result in results:
                 if "GSTIN" in result and len(result["GSTIN"]) == 15:
+                    gstin = result["GSTIN"]
+                    if gstin in seen_gstins or gstin in new_gstins:
+                        continue
+                    new_gstins.add(gstin)
                     new_gstin_rows.append({
                         "PAN_Reference": pan,
                         "GSTIN": result["GSTIN"],
@@ -418,26 +680,14 @@ def update_excel_with_results(file_path, pan_df, gstin_df, results_dict):
                         "Last_Updated": current_time
                     })
         
-        # Create a DataFrame from the new GSTIN rows
+        # Append new GSTINs to the GSTIN sheet
         if new_gstin_rows:
-            new_gstin_df = pd.DataFrame(new_gstin_rows)
-            
-            # Check for duplicates in the GSTIN sheet
-            if not gstin_df.empty:
-                # Create a set of existing GSTINs for faster lookup
-                existing_gstins = set(gstin_df["GSTIN"].dropna())
-                
-                # Filter out GSTINs that already exist
-                new_gstin_df = new_gstin_df[~new_gstin_df["GSTIN"].isin(existing_gstins)]
-                
-            # Append new GSTINs to the GSTIN sheet
-            gstin_df = pd.concat([gstin_df, new_gstin_df], ignore_index=True)
-            logger.info(f"Added {len(new_gstin_df)} new GSTIN entries to GSTIN sheet")
+            gstin_df = pd.concat([gstin_df, pd.DataFrame(new_gstin_rows)], ignore_index=True)
+            logger.info(f"Added {len(new_gstin_rows)} new GSTIN entries to GSTIN sheet")
         
         # Save the updated DataFrames back to the file
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            pan_df.to_excel(writer, sheet_name=PAN_SHEET_NAME, index=False)
-            gstin_df.to_excel(writer, sheet_name=GSTIN_SHEET_NAME, index=False)
+        write_two_sheets(file_path, pan_df, gstin_df)
+        seen_gstins.update(new_gstins)
         logger.info(f"Saved updated Excel file with {len(pan_df)} PAN entries and {len(gstin_df)} GSTIN entries")
         
         return pan_df, gstin_df
@@ -462,7 +712,8 @@ def update_excel_with_gstin_details(file_path, gstin, details):
     """
     logger.info(f"Updating Excel file with details for GSTIN: {gstin}")
     logger.info(f"File path: {file_path}")
-    logger.info(f"Details received: {json.dumps(details, indent=2)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Details received: {json.dumps(details, indent=2)}")
     
     try:
         # Check file extension to determine if it's CSV or Excel
@@ -488,19 +739,19 @@ def update_excel_with_gstin_details(file_path, gstin, details):
                 
                 # Update each matching row
                 for row_idx in matching_rows:
-                    logger.info(f"Updating row {row_idx} with GSTIN {gstin}")
+                    logger.debug(f"Updating row {row_idx} with GSTIN {gstin}")
                     
                     # Update Trade Name
                     if "trade_name" in details and details["trade_name"]:
                         df.at[row_idx, "Trade_Name"] = details["trade_name"]
-                        logger.info(f"Updated Trade_Name to: {details['trade_name']}")
+                        logger.debug(f"Updated Trade_Name to: {details['trade_name']}")
                     else:
                         logger.warning("No trade_name found in details")
                     
                     # Update Registration Date
                     if "registration_date" in details and details["registration_date"]:
                         df.at[row_idx, "Registration_Date"] = details["registration_date"]
-                        logger.info(f"Updated Registration_Date to: {details['registration_date']}")
+                        logger.debug(f"Updated Registration_Date to: {details['registration_date']}")
                     else:
                         logger.warning("No registration_date found in details")
                     
@@ -508,7 +759,7 @@ def update_excel_with_gstin_details(file_path, gstin, details):
                     if "hsn_codes" in details and details["hsn_codes"]:
                         hsn_codes_str = ", ".join(details["hsn_codes"])
                         df.at[row_idx, "HSN_Codes"] = hsn_codes_str
-                        logger.info(f"Updated HSN_Codes to: {hsn_codes_str}")
+                        logger.debug(f"Updated HSN_Codes to: {hsn_codes_str}")
                     else:
                         logger.warning("No hsn_codes found in details")
                 
@@ -545,7 +796,7 @@ def update_excel_with_gstin_details(file_path, gstin, details):
                 
             # Get the row index for this GSTIN
             row_idx = gstin_rows[0]
-            logger.info(f"Found GSTIN at row index {row_idx}")
+            logger.debug(f"Found GSTIN at row index {row_idx}")
             
             # Update the GSTIN details
             current_time = datetime.datetime.now().isoformat()
@@ -553,14 +804,14 @@ def update_excel_with_gstin_details(file_path, gstin, details):
             # Update Trade Name
             if "trade_name" in details and details["trade_name"]:
                 gstin_df.at[row_idx, "Trade_Name"] = details["trade_name"]
-                logger.info(f"Updated Trade_Name to: {details['trade_name']}")
+                logger.debug(f"Updated Trade_Name to: {details['trade_name']}")
             else:
                 logger.warning("No trade_name found in details")
                 
             # Update Registration Date
             if "registration_date" in details and details["registration_date"]:
                 gstin_df.at[row_idx, "Registration_Date"] = details["registration_date"]
-                logger.info(f"Updated Registration_Date to: {details['registration_date']}")
+                logger.debug(f"Updated Registration_Date to: {details['registration_date']}")
             else:
                 logger.warning("No registration_date found in details")
                 
@@ -569,45 +820,157 @@ def update_excel_with_gstin_details(file_path, gstin, details):
                 # Convert list to string for storage in Excel
                 hsn_codes_str = ", ".join(details["hsn_codes"])
                 gstin_df.at[row_idx, "HSN_Codes"] = hsn_codes_str
-                logger.info(f"Updated HSN_Codes to: {hsn_codes_str}")
+                logger.debug(f"Updated HSN_Codes to: {hsn_codes_str}")
             else:
                 logger.warning("No hsn_codes found in details")
             
-        # Update Last_Updated timestamp
-        gstin_df.at[row_idx, "Last_Updated"] = current_time
+            # Update Last_Updated timestamp
+            gstin_df.at[row_idx, "Last_Updated"] = current_time
+            
+            # Log the row state before saving
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"DataFrame before saving: {gstin_df.loc[row_idx].to_dict()}")
+            
+            # Save the updated DataFrames back to the file
+            write_two_sheets(file_path, pan_df, gstin_df)
+            
+            logger.info(f"Successfully updated Excel file with details for GSTIN: {gstin}")
+            return True
+        
+    except Exception as e:
+        logger.error(f"Error updating Excel file with GSTIN details: {e}")
+        return False
+
+def update_excel_with_gstin_details_bulk(file_path, updates):
+    """
+    Update the Excel file with details for many GSTINs, reading and writing it only once.
+    
+    Args:
+        file_path: Path to the Excel file
+        updates: Iterable of (gstin, details) tuples, details as returned by get_gstin_details()
+        
+    Returns:
+        set: GSTINs that were found in the file and updated
+    """
+    # One row of new cell values per GSTIN; empty values leave the existing cell alone
+    detail_rows = {}
+    for gstin, details in updates:
+        detail_rows[gstin] = {
+            "Trade_Name": details.get("trade_name") or None,
+            "Registration_Date": details.get("registration_date") or None,
+            "HSN_Codes": ", ".join(details["hsn_codes"]) if details.get("hsn_codes") else None
+        }
+    
+    if not detail_rows:
+        return set()
+    
+    logger.info(f"Updating {file_path} with details for {len(detail_rows)} GSTINs")
+    
+    try:
+        is_csv = os.path.splitext(file_path)[1].lower() == '.csv'
+        
+        if is_csv:
+            gstin_df = pd.read_csv(file_path)
+        else:
+            is_valid, error_message, pan_df, gstin_df = validate_excel_structure(file_path)
+            
+            if not is_valid:
+                logger.error(f"Invalid Excel structure: {error_message}")
+                return set()
         
-        # Log the DataFrame state before saving
-        logger.info(f"DataFrame before saving: {gstin_df.loc[row_idx].to_dict()}")
-        gstin_df.at[row_idx, "Last_Updated"] = current_time
-        logger.info(f"Updated Last_Updated to: {current_time}")
-        gstin_df.at[row_idx, "Last_Updated"] = current_time
+        details_df = pd.DataFrame.from_dict(detail_rows, orient='index')
+        for col in list(details_df.columns) + ["Last_Updated"]:
+            if col not in gstin_df.columns:
+                gstin_df[col] = ""
+            # Empty columns are read back as float; make them hold text
+            gstin_df[col] = gstin_df[col].astype(object)
         
-        # Save the updated DataFrames back to the file
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            pan_df.to_excel(writer, sheet_name=PAN_SHEET_NAME, index=False)
-            gstin_df.to_excel(writer, sheet_name=GSTIN_SHEET_NAME, index=False)
+        matched = gstin_df.loc[gstin_df["GSTIN"].isin(details_df.index), "GSTIN"]
+        if matched.empty:
+            logger.warning("None of the GSTINs were found in the file")
+            return set()
+        
+        # Map each matching row to its new values and assign them column by column
+        for col in details_df.columns:
+            new_values = matched.map(details_df[col]).dropna()
+            gstin_df.loc[new_values.index, col] = new_values
+        
+        if is_csv:
+            gstin_df.to_csv(file_path, index=False)
+        else:
+            gstin_df.loc[matched.index, "Last_Updated"] = datetime.datetime.now().isoformat()
             
-        logger.info(f"Successfully updated Excel file with details for GSTIN: {gstin}")
-        return True
+            write_two_sheets(file_path, pan_df, gstin_df)
+        
+        updated = set(matched)
+        missing = len(detail_rows) - len(updated)
+        if missing:
+            logger.warning(f"{missing} GSTINs were not found in the file")
+        logger.info(f"Successfully updated {file_path} with details for {len(updated)} GSTINs")
+        return updated
         
     except Exception as e:
         logger.error(f"Error updating Excel file with GSTIN details: {e}")
-        return False
+        return set()
 
 # Create screenshots directory if it doesn't exist
 if not os.path.exists(SCREENSHOT_DIR):
     os.makedirs(SCREENSHOT_DIR)
 
 # Processing parameters
-BATCH_SIZE = 10  # Number of PANs to process before writing to file
+PAN_WORKERS = int(os.environ.get("PAN_WORKERS", 1))  # Browsers searching PANs in parallel, each with its own Chrome
+CHROME_BIN = os.environ.get("CHROME_BIN", "/usr/bin/chromium")  # Chromium binary for the PAN search browsers
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH")  # Installed chromedriver; if unset, webdriver-manager provides one
+PAN_CACHE_TTL = int(os.environ.get("PAN_CACHE_TTL_HOURS", 24 * 7)) * 3600  # Seconds a cached PAN result stays valid
 MAX_RETRIES = 5  # Maximum number of retries for captcha solving
 DELAY_BETWEEN_REQUESTS = (1, 3)  # Random delay range between requests (min, max)
+CAPTCHA_SOLVER_THREADS = len(TRUECAPTCHA_ACCOUNTS) * 2  # Maximum TrueCaptcha API calls in flight
+CAPTCHA_SOLVE_TIMEOUT = 60  # Seconds to wait for any TrueCaptcha account to answer
+MAX_CAPTCHA_BACKOFF = 8  # Longest wait in seconds before retrying a TrueCaptcha API call
+TRUECAPTCHA_EXHAUSTED_COOLDOWN = int(os.environ.get("TRUECAPTCHA_EXHAUSTED_COOLDOWN_MINUTES", 60)) * 60  # Seconds an account over its usage limit is skipped
+CAPTCHA_MEMO_SIZE = 256  # Captcha answers remembered, so an image seen again is not sent to TrueCaptcha
+PAGE_WAIT_TIMEOUT = 10  # Seconds to wait for the portal to finish a search or reload the search page
+WAIT_POLL_INTERVAL = 0.2  # Seconds between checks while waiting on the page; Selenium's default is 0.5
+DEBUG_SCREENSHOTS = os.environ.get("DEBUG_SCREENSHOTS", "").lower() in ("1", "true", "yes")  # Screenshot every results page, not only failures
+
+# Captcha API calls run on this pool so browser work can continue while they are in flight
+captcha_executor = ThreadPoolExecutor(max_workers=CAPTCHA_SOLVER_THREADS, thread_name_prefix="captcha")
+
+# TrueCaptcha accounts that reported their usage limit, by index, with the time.monotonic()
+# they did; skipped while others remain, until TRUECAPTCHA_EXHAUSTED_COOLDOWN has passed
+exhausted_accounts = {}
+
+# Answers to recently solved captcha images by SHA-1 of the image, oldest first
+captcha_answers = OrderedDict()
+captcha_answers_lock = threading.Lock()
+
+# TrueCaptcha API calls share one session so connections are kept alive between captchas
+truecaptcha_session = requests.Session()
+truecaptcha_session.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=len(TRUECAPTCHA_ACCOUNTS), pool_maxsize=CAPTCHA_SOLVER_THREADS
+))
+
 # ===== CAPTCHA HANDLING FUNCTIONS =====
 
+def available_captcha_accounts():
+    """
+    Get the TrueCaptcha accounts to try, letting exhausted accounts back in once
+    TRUECAPTCHA_EXHAUSTED_COOLDOWN has passed since they reported their usage limit.
+    
+    Returns:
+        list: Indexes of the accounts that are not cooling down
+    """
+    now = time.monotonic()
+    for account_index, marked_at in list(exhausted_accounts.items()):
+        if now - marked_at >= TRUECAPTCHA_EXHAUSTED_COOLDOWN:
+            logger.info(f"TrueCaptcha account {account_index} has cooled down, using it again")
+            exhausted_accounts.pop(account_index, None)
+    return [i for i in range(len(TRUECAPTCHA_ACCOUNTS)) if i not in exhausted_accounts]
+
+
 def solve_captcha_with_truecaptcha(captcha_path, account_index=0):
     """
     Solve captcha using TrueCaptcha API with a file path.
-    Enhanced with better image validation and processing.
     
     Args:
         captcha_path: Path to the captcha image file
@@ -616,169 +979,463 @@ def solve_captcha_with_truecaptcha(captcha_path, account_index=0):
     Returns:
         str: The captcha solution or None if failed
     """
-    account = TRUECAPTCHA_ACCOUNTS[account_index]
-    userid = account["userid"]
-    apikey = account["apikey"]
-    
     try:
         # Check if file exists and is readable
         if not os.path.exists(captcha_path):
             logger.error(f"File does not exist: {captcha_path}")
             return None
-            
-        file_size = os.path.getsize(captcha_path)
-        if file_size == 0:
-            logger.error(f"File is empty: {captcha_path}")
+        
+        with open(captcha_path, "rb") as image_file:
+            image_data = image_file.read()
+        logger.info(f"Read {len(image_data)} bytes from {captcha_path}")
+    except Exception as e:
+        logger.error(f"Error reading captcha file: {e}")
+        return None
+    
+    return solve_captcha_with_truecaptcha_bytes(image_data, account_index)
+
+
+def solve_captcha_with_truecaptcha_bytes(image_data, account_index=0):
+    """
+    Solve captcha using TrueCaptcha API with the image bytes held in memory.
+    Enhanced with better image validation and processing.
+    
+    Args:
+        image_data: The captcha image as PNG bytes
+        account_index: Index of the TrueCaptcha account to use
+        
+    Returns:
+        str: The captcha solution or None if failed
+    """
+    account = TRUECAPTCHA_ACCOUNTS[account_index]
+    userid = account["userid"]
+    apikey = account["apikey"]
+    
+    try:
+        if not image_data:
+            logger.error("Captcha image is empty")
             return None
             
-        # Skip small files that are likely not valid images
-        if file_size < 1000:
-            logger.warning(f"File is too small, might not be a valid image: {captcha_path} (size: {file_size} bytes)")
+        # Skip small images that are likely not valid
+        if len(image_data) < 1000:
+            logger.warning(f"Captcha image is too small, might not be a valid image (size: {len(image_data)} bytes)")
             return None
-            
-        logger.info(f"Reading file: {captcha_path} (size: {file_size} bytes)")
         
-        # Verify the file is a valid image and check dimensions
+        # Verify the bytes are a valid image and check dimensions
         try:
-            with open(captcha_path, "rb") as image_file:
-                image_data = image_file.read()
-                img = Image.open(io.BytesIO(image_data))
-                width, height = img.size
-                logger.info(f"Image dimensions: {width}x{height}")
+            img = Image.open(io.BytesIO(image_data))
+            width, height = img.size
+            logger.info(f"Image dimensions: {width}x{height}")
+            
+            # Check if image dimensions are reasonable for a captcha
+            if width <= 2 or height <= 2:
+                logger.warning(f"Image dimensions too small: {width}x{height}")
+                return None
                 
-                # Check if image dimensions are reasonable for a captcha
-                if width <= 2 or height <= 2:
-                    logger.warning(f"Image dimensions too small: {width}x{height}")
-                    return None
-                    
-                # Check if image is mostly blank/white (common for loading images)
-                # Convert to grayscale and check pixel values
-                img_gray = img.convert('L')
-                pixels = list(img_gray.getdata())
-                avg_pixel_value = sum(pixels) / len(pixels) if pixels else 0
+            # Check if image is mostly blank/white (common for loading images)
+            # Convert to grayscale and check pixel values
+            pixels = np.asarray(img.convert('L'), dtype=np.uint8)
+            avg_pixel_value = float(pixels.mean())
+            
+            # If average pixel value is very high (close to white), image might be blank
+            if avg_pixel_value > 240:  # 255 is white
+                logger.warning(f"Image appears to be mostly blank (avg pixel value: {avg_pixel_value})")
+                return None
+            
+            # An image of a single flat color has no text to read, whatever its shade
+            pixel_std = float(pixels.std())
+            if pixel_std < 5:
+                logger.warning(f"Image has almost no contrast (pixel std dev: {pixel_std})")
+                return None
                 
-                # If average pixel value is very high (close to white), image might be blank
-                if avg_pixel_value > 240:  # 255 is white
-                    logger.warning(f"Image appears to be mostly blank (avg pixel value: {avg_pixel_value})")
-                    return None
-                    
-                logger.info("File is a valid image with reasonable dimensions")
+            logger.info("Captcha is a valid image with reasonable dimensions")
         except Exception as e:
-            logger.error(f"File is not a valid image: {e}")
+            logger.error(f"Captcha is not a valid image: {e}")
             return None
         
-        # Read the file again for API submission
-        with open(captcha_path, "rb") as image_file:
-            image_data = image_file.read()
-            logger.info(f"Read {len(image_data)} bytes from file")
-            
-            encoded_string = base64.b64encode(image_data).decode('ascii')
-            logger.info(f"Base64 encoded string length: {len(encoded_string)}")
-            
-            url = 'https://api.apitruecaptcha.org/one/gettext'
-
-            data = {
-                'userid': userid,
-                'apikey': apikey,
-                'data': encoded_string,
-                'numeric': 1,  # Specify that we expect numeric result
-                'len_min': 6,  # Minimum length
-                'len_max': 6   # Maximum length
-            }
-            
-            logger.info(f"Sending captcha file to TrueCaptcha API using account: {userid}")
-            
-            # Log detailed request data in test mode
-            if TEST_MODE:
-                # Don't log the full base64 string to avoid huge logs
-                safe_data = data.copy()
-                if 'data' in safe_data:
-                    safe_data['data'] = f"[Base64 encoded image, length: {len(safe_data['data'])}]"
-                logger.debug(f"TrueCaptcha API request data: {safe_data}")
-            
-            # Add exponential backoff retry for API request
-            max_retries = 3
-            for retry in range(max_retries):
-                try:
-                    # Add delay for retries
-                    if retry > 0:
-                        backoff_time = 2 ** retry
-                        logger.info(f"Retry {retry}/{max_retries-1}, waiting {backoff_time} seconds")
-                        time.sleep(backoff_time)
+        # Encode the bytes already read for API submission
+        encoded_string = base64.b64encode(image_data).decode('ascii')
+        logger.info(f"Base64 encoded string length: {len(encoded_string)}")
+        
+        url = 'https://api.apitruecaptcha.org/one/gettext'
+
+        data = {
+            'userid': userid,
+            'apikey': apikey,
+            'data': encoded_string,
+            'numeric': 1,  # Specify that we expect numeric result
+            'len_min': 6,  # Minimum length
+            'len_max': 6   # Maximum length
+        }
+        
+        logger.info(f"Sending captcha to TrueCaptcha API using account: {userid}")
+        
+        # Log detailed request data in test mode
+        if TEST_MODE:
+            # Don't log the full base64 string to avoid huge logs
+            safe_data = data.copy()
+            if 'data' in safe_data:
+                safe_data['data'] = f"[Base64 encoded image, length: {len(safe_data['data'])}]"
+            logger.debug(f"TrueCaptcha API request data: {safe_data}")
+        
+        # Add exponential backoff retry for API request
+        max_retries = 3
+        for retry in range(max_retries):
+            try:
+                # Add a jittered delay for retries, so calls that failed together don't retry together
+                if retry > 0:
+                    backoff_time = min(2 ** retry, MAX_CAPTCHA_BACKOFF)
+                    backoff_time = random.uniform(backoff_time / 2, backoff_time)
+                    logger.info(f"Retry {retry}/{max_retries-1}, waiting {backoff_time:.1f} seconds")
+                    time.sleep(backoff_time)
+                
+                response = truecaptcha_session.post(url=url, json=data, timeout=15)
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    logger.info(f"API response: {result}")
                     
-                    response = requests.post(url=url, json=data, timeout=15)
+                    if 'result' in result:
+                        captcha_text = result['result']
+                        captcha_text = NON_DIGIT_RE.sub('', captcha_text)
+                        if len(captcha_text) == 6:
+                            logger.info(f"Captcha solved: {captcha_text}")
+                            return captcha_text
+                        else:
+                            logger.warning(f"Captcha solution '{captcha_text}' is not 6 digits")
                     
-                    if response.status_code == 200:
-                        result = response.json()
-                        logger.info(f"API response: {result}")
-                        
-                        if 'result' in result:
-                            captcha_text = result['result']
-                            captcha_text = re.sub(r'[^0-9]', '', captcha_text)
-                            if len(captcha_text) == 6:
-                                logger.info(f"Captcha solved: {captcha_text}")
-                                return captcha_text
-                            else:
-                                logger.warning(f"Captcha solution '{captcha_text}' is not 6 digits")
-                        
-                        # Check if it's a usage limit error
-                        if 'error_message' in result and "above free usage limit" in result['error_message']:
-                            logger.warning(f"Account {userid} has reached usage limit")
-                            break  # No need to retry with the same account
-                        
-                        # If we got a response but no valid result, try again
-                        if retry < max_retries - 1:
-                            logger.warning("Invalid API response, retrying...")
-                            continue
-                        
-                        return None
-                    else:
-                        logger.warning(f"TrueCaptcha API request failed with status code: {response.status_code}")
-                        logger.warning(f"Response content: {response.text}")
-                        
-                        # If it's a server error, retry
-                        if response.status_code >= 500 and retry < max_retries - 1:
-                            logger.warning("Server error, retrying...")
-                            continue
-                        
-                        return None
-                except requests.exceptions.RequestException as e:
-                    logger.warning(f"Request exception: {e}")
+                    # Check if it's a usage limit error
+                    if 'error_message' in result and "above free usage limit" in result['error_message']:
+                        logger.warning(f"Account {userid} has reached usage limit")
+                        exhausted_accounts[account_index] = time.monotonic()
+                        break  # No need to retry with the same account
+                    
+                    # If we got a response but no valid result, try again
                     if retry < max_retries - 1:
-                        logger.warning("Network error, retrying...")
+                        logger.warning("Invalid API response, retrying...")
                         continue
+                    
                     return None
-            
-            return None
+                else:
+                    logger.warning(f"TrueCaptcha API request failed with status code: {response.status_code}")
+                    logger.warning(f"Response content: {response.text}")
+                    
+                    # If it's a server error, retry
+                    if response.status_code >= 500 and retry < max_retries - 1:
+                        logger.warning("Server error, retrying...")
+                        continue
+                    
+                    return None
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Request exception: {e}")
+                if retry < max_retries - 1:
+                    logger.warning("Network error, retrying...")
+                    continue
+                return None
+        
+        return None
     except Exception as e:
-        logger.error(f"Error solving captcha with file: {e}")
+        logger.error(f"Error solving captcha: {e}")
         return None
 
 
-def handle_captcha(driver, max_retries=5):
+def submit_captcha(image_data, account_index=0):
     """
-    Handle captcha on the GST website with improved image loading detection.
+    Start solving a captcha with TrueCaptcha in the background.
     
     Args:
-        driver: Selenium WebDriver instance
-        max_retries: Maximum number of retries
+        image_data: The captcha image as PNG bytes
+        account_index: Index of the TrueCaptcha account to use
         
     Returns:
-        bool: True if captcha was handled successfully, False otherwise
+        Future: Resolves to the captcha solution or None if failed
+    """
+    return captcha_executor.submit(solve_captcha_with_truecaptcha_bytes, image_data, account_index)
+
+
+def enable_network_log(chrome_options):
     """
-    wait = WebDriverWait(driver, 10)
+    Have Chrome record network events, so captcha images can be read back with
+    get_captcha_from_network.
     
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Captcha handling attempt {attempt+1}/{max_retries}")
-            
-            # Check if captcha input field is present
-            captcha_input = wait.until(
-                EC.presence_of_element_located((By.ID, "fo-captcha"))
-            )
-            
-            logger.info("Captcha input field found")
-            
+    Args:
+        chrome_options: Options for the Chrome driver being created
+    """
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+
+def get_captcha_from_network(driver, captcha_src):
+    """
+    Get the captcha image exactly as the browser received it, without another request
+    to the portal. Reads the response body through the DevTools protocol for the
+    latest response from the captcha's URL in the browser's network log.
+    
+    Args:
+        driver: Selenium WebDriver instance, created with enable_network_log
+        captcha_src: src of the captcha image element
+        
+    Returns:
+        bytes: The captcha image, or None if it is not available
+    """
+    try:
+        # The image may be inlined in the page
+        if captcha_src.startswith('data:image') and ';base64,' in captcha_src:
+            return base64.b64decode(captcha_src.split(',', 1)[1])
+        
+        # Reading the log also clears it, so each captcha only searches the events since the last one
+        request_id = None
+        for entry in driver.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            if (message['method'] == 'Network.responseReceived'
+                    and message['params']['response']['url'] == captcha_src):
+                request_id = message['params']['requestId']
+        
+        if request_id is None:
+            logger.debug("Captcha response not found in the browser's network log")
+            return None
+        
+        body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        if not body.get('base64Encoded'):
+            return None
+        return base64.b64decode(body['body'])
+    except Exception as e:
+        logger.debug(f"Could not read captcha from the browser's network log: {e}")
+        return None
+
+
+def image_size(image_data):
+    """
+    Get the dimensions of an image. For PNGs they are read straight from the header
+    instead of opening the image with PIL.
+    
+    Args:
+        image_data: The image bytes
+        
+    Returns:
+        tuple: (width, height)
+    """
+    if image_data[:8] == b'\x89PNG\r\n\x1a\n' and image_data[12:16] == b'IHDR':
+        return struct.unpack('>II', image_data[16:24])
+    return Image.open(io.BytesIO(image_data)).size
+
+
+def recall_captcha_answer(digest):
+    """
+    Get the remembered answer for a captcha image.
+    
+    Args:
+        digest: SHA-1 hex digest of the captcha image
+        
+    Returns:
+        str: The answer, or None if the image has not been solved before
+    """
+    with captcha_answers_lock:
+        answer = captcha_answers.get(digest)
+        if answer is not None:
+            captcha_answers.move_to_end(digest)
+        return answer
+
+
+def remember_captcha_answer(digest, answer):
+    """
+    Remember the answer for a captcha image, keeping the CAPTCHA_MEMO_SIZE most
+    recently used answers.
+    
+    Args:
+        digest: SHA-1 hex digest of the captcha image
+        answer: The answer, or None to forget an answer the portal rejected
+    """
+    with captcha_answers_lock:
+        if answer is None:
+            captcha_answers.pop(digest, None)
+            return
+        captcha_answers[digest] = answer
+        captcha_answers.move_to_end(digest)
+        while len(captcha_answers) > CAPTCHA_MEMO_SIZE:
+            captcha_answers.popitem(last=False)
+
+
+def save_debug_captcha(image_data, prefix):
+    """
+    Save a captcha image to the screenshots directory in test mode, for debugging.
+    
+    Args:
+        image_data: The captcha image as PNG bytes
+        prefix: Start of the file name, e.g. "captcha_direct"
+    """
+    if not TEST_MODE:
+        return
+    captcha_path = os.path.join(SCREENSHOT_DIR, f"{prefix}_{int(time.time())}.png")
+    with open(captcha_path, "wb") as f:
+        f.write(image_data)
+    logger.debug(f"Saved captcha image to {captcha_path}")
+
+
+def save_page_screenshot(driver, prefix):
+    """
+    Save a screenshot of the current page to the screenshots directory, for debugging.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        prefix: Start of the file name, e.g. "results_page_ABCDE1234F"
+    """
+    screenshot_path = os.path.join(SCREENSHOT_DIR, f"{prefix}_{int(time.time())}.png")
+    try:
+        driver.save_screenshot(screenshot_path)
+        logger.info(f"Saved page screenshot to {screenshot_path}")
+    except Exception as e:
+        logger.warning(f"Could not save page screenshot: {e}")
+
+
+# True once the portal has answered a search: the results table or "No records found" is
+# shown, the captcha box is gone, or a new captcha replaced the one that was answered
+SEARCH_FINISHED_SCRIPT = """
+var captcha = document.getElementById('imgCaptcha');
+return !!document.querySelector('table.table.tbl.inv.exp.table-bordered.ng-table')
+    || document.body.innerText.indexOf('No records found') !== -1
+    || !document.getElementById('fo-captcha')
+    || (!!captcha && captcha.getAttribute('src') !== arguments[0]);
+"""
+
+
+# Calls back as soon as the captcha image loses its "captcha-loading" class, watching the
+# class with a MutationObserver instead of polling it
+CAPTCHA_LOADED_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var captcha = document.getElementById('imgCaptcha');
+if (!captcha || !captcha.classList.contains('captcha-loading')) {
+    done();
+    return;
+}
+new MutationObserver(function (mutations, observer) {
+    if (!captcha.classList.contains('captcha-loading')) {
+        observer.disconnect();
+        done();
+    }
+}).observe(captcha, {attributes: true, attributeFilter: ['class']});
+"""
+
+
+def page_shows_no_records(driver):
+    """
+    Check whether the portal is showing its "No records found" message, without
+    transferring the whole page source from the browser.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        
+    Returns:
+        bool: True if the message is on the page
+    """
+    return driver.execute_script("return document.body.innerText.indexOf('No records found') !== -1;")
+
+
+def page_wait(driver):
+    """
+    Get the driver's shared PAGE_WAIT_TIMEOUT wait, creating it on first use.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        
+    Returns:
+        WebDriverWait: Wait that polls every WAIT_POLL_INTERVAL seconds
+    """
+    wait = getattr(driver, "page_wait", None)
+    if wait is None:
+        wait = driver.page_wait = WebDriverWait(driver, PAGE_WAIT_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL)
+    return wait
+
+
+def wait_for_search(driver, captcha_src):
+    """
+    Wait for the portal to answer a submitted search, for at most PAGE_WAIT_TIMEOUT seconds.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        captcha_src: src of the captcha image that was answered
+    """
+    try:
+        page_wait(driver).until(
+            lambda d: d.execute_script(SEARCH_FINISHED_SCRIPT, captcha_src)
+        )
+    except TimeoutException:
+        logger.warning(f"Portal did not answer the search within {PAGE_WAIT_TIMEOUT} seconds")
+
+
+def refresh_search_page(driver):
+    """
+    Reload the search page and wait until its search box is back.
+    
+    Args:
+        driver: Selenium WebDriver instance
+    """
+    driver.refresh()
+    page_wait(driver).until(
+        EC.presence_of_element_located((By.ID, "for_gstin"))
+    )
+
+
+# Clears the search and captcha boxes in place and returns true, if the search form is
+# still showing and no results from the last search are on the page; returns false otherwise
+RESET_SEARCH_FORM_SCRIPT = """
+var searchInput = document.getElementById('for_gstin');
+var captchaInput = document.getElementById('fo-captcha');
+if (!searchInput || !captchaInput || searchInput.offsetParent === null
+        || document.querySelector('table.table.tbl.inv.exp.table-bordered.ng-table')
+        || document.body.innerText.indexOf('No records found') !== -1) {
+    return false;
+}
+[searchInput, captchaInput].forEach(function (input) {
+    input.value = '';
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+});
+return true;
+"""
+
+
+def reset_search_form(driver):
+    """
+    Get the search form ready for the next search, clearing it in place when possible
+    and reloading the page only when the last search's results are showing.
+    
+    Args:
+        driver: Selenium WebDriver instance
+    """
+    if driver.execute_script(RESET_SEARCH_FORM_SCRIPT):
+        logger.debug("Cleared search form without reloading")
+    else:
+        refresh_search_page(driver)
+
+
+def handle_captcha(driver, max_retries=5, search_value=None, rate_limiter=None):
+    """
+    Handle captcha on the GST website with improved image loading detection.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        max_retries: Maximum number of retries
+        search_value: PAN or GSTIN to type into the search box while each captcha is
+                      being solved, so it is entered again after every page refresh
+        rate_limiter: Optional limiter whose acquire() is waited on before each page
+                      refresh, so retries count against the portal request rate
+        
+    Returns:
+        bool: True if captcha was handled successfully, False otherwise
+    """
+    wait = page_wait(driver)
+    
+    for attempt in range(max_retries):
+        try:
+            logger.info(f"Captcha handling attempt {attempt+1}/{max_retries}")
+            
+            # Check if captcha input field is present
+            captcha_input = wait.until(
+                EC.presence_of_element_located((By.ID, "fo-captcha"))
+            )
+            
+            logger.info("Captcha input field found")
+            
             # Find the captcha image element with ID "imgCaptcha"
             logger.info("Looking for captcha image element with ID 'imgCaptcha'...")
             captcha_element = wait.until(
@@ -796,9 +1453,8 @@ def handle_captcha(driver, max_retries=5):
                 
                 # Wait for the "captcha-loading" class to disappear (max 10 seconds)
                 try:
-                    WebDriverWait(driver, 10).until_not(
-                        lambda d: "captcha-loading" in d.find_element(By.ID, "imgCaptcha").get_attribute('class')
-                    )
+                    driver.set_script_timeout(10)
+                    driver.execute_async_script(CAPTCHA_LOADED_SCRIPT)
                     logger.info("Captcha image finished loading")
                 except TimeoutException:
                     logger.warning("Timed out waiting for captcha image to load, proceeding anyway")
@@ -824,111 +1480,102 @@ def handle_captcha(driver, max_retries=5):
             
             # Try multiple approaches to capture the captcha image
             
-            # Approach 1: Direct screenshot
-            captcha_path = os.path.join(SCREENSHOT_DIR, f"captcha_direct_{int(time.time())}.png")
-            captcha_element.screenshot(captcha_path)
-            logger.info(f"Saved captcha screenshot to {captcha_path}")
+            # Approach 1: The exact bytes the browser received for this captcha
+            captcha_data = get_captcha_from_network(driver, src)
+            if captcha_data:
+                logger.info(f"Read captcha image from the browser ({len(captcha_data)} bytes)")
+                save_debug_captcha(captcha_data, "captcha_network")
+            else:
+                # Approach 2: Direct screenshot, kept in memory
+                captcha_data = captcha_element.screenshot_as_png
+                save_debug_captcha(captcha_data, "captcha_direct")
             
-            # Check if the screenshot is valid and has reasonable dimensions
+            # Check if the image is valid and has reasonable dimensions
             try:
-                img = Image.open(captcha_path)
-                width, height = img.size
+                width, height = image_size(captcha_data)
                 logger.info(f"Captcha image dimensions: {{'width': {width}, 'height': {height}}}")
                 
-                # If image is too small, try alternative approaches
-                if width <= 2 or height <= 2 or os.path.getsize(captcha_path) < 1000:
-                    logger.warning(f"Captcha image is too small ({width}x{height}), trying alternative approach")
-                    
-                    # Approach 2: Download the image directly from the src URL
-                    captcha_src = captcha_element.get_attribute('src')
-                    
-                    # Get the full URL if it's a relative URL
-                    if captcha_src.startswith('/'):
-                        base_url = driver.current_url
-                        base_domain = '/'.join(base_url.split('/')[:3])  # Get https://domain.com part
-                        captcha_src = base_domain + captcha_src
-                    
-                    # Add a random parameter to force a fresh captcha
-                    if '?' in captcha_src:
-                        captcha_src += f"&refresh={random.random()}"
-                    else:
-                        captcha_src += f"?refresh={random.random()}"
-                    
-                    logger.info(f"Downloading captcha directly from URL: {captcha_src}")
-                    
-                    # Use a session with headers to mimic a browser
-                    session = requests.Session()
-                    session.headers.update({
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-                        'Accept-Language': 'en-US,en;q=0.9',
-                        'Referer': driver.current_url,
-                    })
-                    
-                    response = session.get(captcha_src, timeout=10)
-                    if response.status_code == 200:
-                        download_path = os.path.join(SCREENSHOT_DIR, f"captcha_download_{int(time.time())}.png")
-                        with open(download_path, "wb") as f:
-                            f.write(response.content)
-                        logger.info(f"Saved downloaded captcha to {download_path}")
-                        
-                        # Use the downloaded image instead
-                        captcha_path = download_path
-                        
-                        # Verify the downloaded image
-                        img = Image.open(captcha_path)
-                        width, height = img.size
-                        logger.info(f"Downloaded captcha dimensions: {{'width': {width}, 'height': {height}}}")
-                    else:
-                        logger.warning(f"Failed to download captcha image: {response.status_code}")
+                if width <= 2 or height <= 2:
+                    logger.warning(f"Captcha image is too small ({width}x{height})")
             except Exception as e:
                 logger.warning(f"Error checking captcha image: {e}")
             
-            # Try to solve the captcha with TrueCaptcha API
-            # Try each account
-            for account_index in range(len(TRUECAPTCHA_ACCOUNTS)):
-                captcha_text = solve_captcha_with_truecaptcha(captcha_path, account_index)
-                
-                if captcha_text:
-                    # Enter the captcha solution
-                    captcha_input.clear()
-                    captcha_input.send_keys(captcha_text)
-                    logger.info(f"Entered captcha solution: {captcha_text}")
-                    
-                    # Click the search button
-                    search_button = wait.until(
-                        EC.element_to_be_clickable((By.ID, "lotsearch"))
-                    )
-                    search_button.click()
-                    logger.info("Clicked search button")
-                    
-                    # Wait for results to load
-                    time.sleep(3)
-                    
-                    # Check if we've moved to the results page
-                    results_elements = driver.find_elements(By.CSS_SELECTOR, "table.table.tbl.inv.exp.table-bordered.ng-table")
-                    no_records_text = "No records found" in driver.page_source
-                    
-                    if results_elements or no_records_text:
-                        logger.info("Captcha solved successfully - results page detected")
-                        return True
-                    else:
-                        # Check if we're still on the captcha page
-                        if driver.find_elements(By.ID, "fo-captcha"):
-                            logger.warning("Captcha solution was incorrect, trying another account")
-                            continue
-                        else:
-                            # We're on some other page, assume success
-                            logger.info("Captcha page no longer visible, assuming success")
-                            return True
+            # Reuse the answer if this exact image was solved before; otherwise race the
+            # TrueCaptcha accounts on it and use the first answer
+            captcha_digest = hashlib.sha1(captcha_data).hexdigest()
+            captcha_text = recall_captcha_answer(captcha_digest)
+            captcha_futures = []
+            if captcha_text:
+                logger.info("Captcha image was solved before, reusing its answer")
+            else:
+                accounts = available_captcha_accounts()
+                if not accounts:
+                    logger.warning("All TrueCaptcha accounts have reached their usage limit, trying them all again")
+                    accounts = list(range(len(TRUECAPTCHA_ACCOUNTS)))
+                captcha_futures = [submit_captcha(captcha_data, account_index) for account_index in accounts]
             
-            # If TrueCaptcha API failed with both accounts, try again with a new captcha
-            logger.warning("All TrueCaptcha accounts failed to solve the captcha, trying again with a new captcha")
+            # Get the form ready while the API works on the captcha
+            if search_value is not None:
+                search_input = wait.until(
+                    EC.presence_of_element_located((By.ID, "for_gstin"))
+                )
+                search_input.clear()
+                search_input.send_keys(search_value)
+                logger.info(f"Entered search value: {search_value}")
+            captcha_input.clear()
+            search_button = wait.until(
+                EC.element_to_be_clickable((By.ID, "lotsearch"))
+            )
+            
+            try:
+                for captcha_future in as_completed(captcha_futures, timeout=CAPTCHA_SOLVE_TIMEOUT):
+                    captcha_text = captcha_future.result()
+                    if captcha_text:
+                        remember_captcha_answer(captcha_digest, captcha_text)
+                        break
+            except FuturesTimeoutError:
+                logger.warning(f"No TrueCaptcha solution within {CAPTCHA_SOLVE_TIMEOUT} seconds")
+            
+            # Drop the calls that have not started yet; the answer is no longer needed
+            for captcha_future in captcha_futures:
+                captcha_future.cancel()
+            
+            if captcha_text:
+                # Enter the captcha solution
+                captcha_input.send_keys(captcha_text)
+                logger.info(f"Entered captcha solution: {captcha_text}")
+                
+                # Click the search button
+                search_button.click()
+                logger.info("Clicked search button")
+                
+                # Wait for results to load
+                wait_for_search(driver, src)
+                
+                # Check if we've moved to the results page
+                results_elements = driver.find_elements(By.CSS_SELECTOR, "table.table.tbl.inv.exp.table-bordered.ng-table")
+                no_records_text = page_shows_no_records(driver)
+                
+                if results_elements or no_records_text:
+                    logger.info("Captcha solved successfully - results page detected")
+                    return True
+                
+                # Check if we're still on the captcha page
+                if not driver.find_elements(By.ID, "fo-captcha"):
+                    # We're on some other page, assume success
+                    logger.info("Captcha page no longer visible, assuming success")
+                    return True
+                
+                logger.warning("Captcha solution was incorrect, trying again with a new captcha")
+                remember_captcha_answer(captcha_digest, None)
+            else:
+                logger.warning("All TrueCaptcha accounts failed to solve the captcha, trying again with a new captcha")
             
             # Try refreshing the page to get a new captcha
             logger.info("Refreshing page to get a new captcha")
-            driver.refresh()
-            time.sleep(2)
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            refresh_search_page(driver)
             
         except Exception as e:
             logger.error(f"Error during captcha handling attempt {attempt+1}: {e}")
@@ -936,8 +1583,9 @@ def handle_captcha(driver, max_retries=5):
             if attempt < max_retries - 1:
                 logger.info("Refreshing page and retrying...")
                 try:
-                    driver.refresh()
-                    time.sleep(2)
+                    if rate_limiter is not None:
+                        rate_limiter.acquire()
+                    refresh_search_page(driver)
                 except:
                     logger.error("Failed to refresh page")
                     return False
@@ -949,6 +1597,31 @@ def handle_captcha(driver, max_retries=5):
     return False
 # ===== SEARCH RESULTS EXTRACTION =====
 
+# Returns the header and cell texts of every search results table, falling back to any
+# table.table when the specific results table is not on the page
+RESULTS_TABLE_SCRIPT = """
+var tables = document.querySelectorAll('table.table.tbl.inv.exp.table-bordered.ng-table');
+var generic = false;
+if (!tables.length) {
+    tables = document.querySelectorAll('table.table');
+    generic = true;
+}
+function cellTexts(cells) {
+    return Array.from(cells).map(function (cell) { return cell.innerText.trim(); });
+}
+return {
+    generic: generic,
+    tables: Array.from(tables).map(function (table) {
+        return {
+            headers: cellTexts(table.querySelectorAll('thead th')),
+            rows: Array.from(table.querySelectorAll('tbody tr')).map(function (row) {
+                return cellTexts(row.querySelectorAll('td'));
+            })
+        };
+    })
+};
+"""
+
 def extract_search_results(driver):
     """
     Extract search results from the page.
@@ -960,14 +1633,9 @@ def extract_search_results(driver):
         list: List of dictionaries containing the search results
     """
     try:
-        # Take a screenshot of the results page for debugging
-        screenshot_path = os.path.join(SCREENSHOT_DIR, f"results_page_{int(time.time())}.png")
-        driver.save_screenshot(screenshot_path)
-        logger.info(f"Saved results page screenshot to {screenshot_path}")
-        
         # Log the HTML content of the results page for debugging
-        html_content = driver.page_source
         if TEST_MODE:
+            html_content = driver.page_source
             logger.debug(f"Results page HTML content: {html_content[:1000]}...")  # Log first 1000 chars to avoid huge logs
             
             # Save the full HTML to a file in test mode
@@ -977,29 +1645,29 @@ def extract_search_results(driver):
             logger.info(f"Saved full HTML content to {html_path}")
         
         # Check if "No records found" message is present
-        if "No records found" in html_content:
+        if page_shows_no_records(driver):
             logger.info("No records found message detected")
             return [{"Result": "No records found"}]
         
         # Wait for the results table to load with increased timeout
         try:
-            WebDriverWait(driver, 10).until(
+            page_wait(driver).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "table.table.tbl.inv.exp.table-bordered.ng-table"))
             )
             logger.info("Results table found")
         except Exception as e:
             logger.warning(f"Results table not found: {e}")
+            save_page_screenshot(driver, "results_page")
             return [{"Result": "Error: Results table not found"}]
         
-        # Try different selectors to find the table
-        tables = driver.find_elements(By.CSS_SELECTOR, "table.table.tbl.inv.exp.table-bordered.ng-table")
+        # Read every results table in one script call instead of a WebDriver call per cell
+        scraped = driver.execute_script(RESULTS_TABLE_SCRIPT)
+        tables = scraped["tables"]
         if not tables:
-            tables = driver.find_elements(By.CSS_SELECTOR, "table.table")
-            if not tables:
-                logger.warning("No tables found on the page")
-                return [{"Result": "Error: No tables found on the page"}]
-            else:
-                logger.info(f"Found {len(tables)} tables with generic selector")
+            logger.warning("No tables found on the page")
+            return [{"Result": "Error: No tables found on the page"}]
+        elif scraped["generic"]:
+            logger.info(f"Found {len(tables)} tables with generic selector")
         else:
             logger.info(f"Found {len(tables)} tables with specific selector")
         
@@ -1007,18 +1675,9 @@ def extract_search_results(driver):
         results = []
         for table_idx, table in enumerate(tables):
             logger.info(f"Processing table {table_idx+1}/{len(tables)}")
+            logger.info(f"Table headers: {table['headers']}")
             
-            # Get table headers to understand the column structure
-            headers = []
-            try:
-                header_cells = table.find_elements(By.CSS_SELECTOR, "thead th")
-                headers = [cell.text.strip() for cell in header_cells]
-                logger.info(f"Table headers: {headers}")
-            except Exception as e:
-                logger.warning(f"Could not extract table headers: {e}")
-            
-            # Get all rows
-            rows = table.find_elements(By.CSS_SELECTOR, "tbody tr")
+            rows = table["rows"]
             logger.info(f"Found {len(rows)} rows in table {table_idx+1}")
             
             if not rows:
@@ -1026,31 +1685,26 @@ def extract_search_results(driver):
                 continue
             
             # Process each row
-            for row_idx, row in enumerate(rows):
-                try:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    if len(cells) >= 4:
-                        # Log all cell values for debugging
-                        cell_values = [cell.text.strip() for cell in cells]
-                        logger.info(f"Row {row_idx+1} cells: {cell_values}")
-                        
-                        # Extract data based on column position
-                        gstin = cells[1].text.strip()
-                        status = cells[2].text.strip()
-                        state = cells[3].text.strip()
-                        
-                        # Validate GSTIN format (should be 15 characters)
-                        if len(gstin) != 15:
-                            logger.warning(f"Invalid GSTIN format: {gstin}")
-                        
-                        results.append({
-                            "GSTIN": gstin,
-                            "GSTIN Status": status,
-                            "State": state
-                        })
-                        logger.info(f"Added result: GSTIN={gstin}, Status={status}, State={state}")
-                except Exception as e:
-                    logger.error(f"Error extracting data from row {row_idx+1}: {e}")
+            for row_idx, cell_values in enumerate(rows):
+                if len(cell_values) >= 4:
+                    # Log all cell values for debugging
+                    logger.info(f"Row {row_idx+1} cells: {cell_values}")
+                    
+                    # Extract data based on column position
+                    gstin = cell_values[1]
+                    status = cell_values[2]
+                    state = cell_values[3]
+                    
+                    # Validate GSTIN format (should be 15 characters)
+                    if len(gstin) != 15:
+                        logger.warning(f"Invalid GSTIN format: {gstin}")
+                    
+                    results.append({
+                        "GSTIN": gstin,
+                        "GSTIN Status": status,
+                        "State": state
+                    })
+                    logger.info(f"Added result: GSTIN={gstin}, Status={status}, State={state}")
         
         if results:
             logger.info(f"Extracted {len(results)} results in total")
@@ -1061,12 +1715,226 @@ def extract_search_results(driver):
             
     except Exception as e:
         logger.error(f"Error extracting search results: {e}")
+        save_page_screenshot(driver, "results_page")
         return [{"Result": f"Error: {str(e)}"}]
 
 
 # ===== MAIN PROCESSING FUNCTION =====
 
-def process_pan_numbers(file_path, headless=False, test_mode=False, limit=None, resume=False):
+# Path of the chromedriver found on PATH or downloaded by webdriver-manager, resolved on first use
+managed_chromedriver_path = None
+managed_chromedriver_lock = threading.Lock()
+
+def get_chromedriver_path():
+    """
+    Get the chromedriver to use for GSTIN detail lookups. CHROMEDRIVER_PATH is used
+    when set, then a chromedriver installed on PATH; only without either is
+    webdriver-manager asked, once per process, since each call checks online for the
+    latest driver version.
+    
+    Returns:
+        str: Path to the chromedriver executable
+    """
+    global managed_chromedriver_path
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    # Parallel batch lookups may all ask at once; resolve the path only once
+    with managed_chromedriver_lock:
+        if managed_chromedriver_path is None:
+            installed_path = shutil.which("chromedriver")
+            if installed_path:
+                managed_chromedriver_path = installed_path
+                logger.info(f"Using installed chromedriver: {managed_chromedriver_path}")
+            else:
+                managed_chromedriver_path = ChromeDriverManager().install()
+                logger.info(f"Using chromedriver from webdriver-manager: {managed_chromedriver_path}")
+    return managed_chromedriver_path
+
+
+def create_browser():
+    """
+    Start a Chrome driver for searching the GST portal.
+    
+    Returns:
+        WebDriver: The new driver
+    """
+    chrome_options = Options()
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.binary_location = CHROME_BIN
+    enable_network_log(chrome_options)
+    
+    service = Service(CHROMEDRIVER_PATH or '/usr/bin/chromedriver')
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    return driver
+
+
+def process_pan(driver, pan):
+    """
+    Search the GST portal for one PAN and leave the browser ready for the next one.
+    
+    Args:
+        driver: Selenium WebDriver instance on the GST portal search page
+        pan: The PAN number to search for
+        
+    Returns:
+        tuple: (list of results for the PAN, driver to use for the next PAN, which is
+                a new one if the browser had to be restarted, or None if it could not be)
+    """
+    try:
+        # Check if browser is still responsive
+        try:
+            current_url = driver.current_url
+        except Exception as e:
+            logger.error(f"Browser connection lost: {e}")
+            logger.info("Restarting browser...")
+            
+            # Restart the browser
+            try:
+                driver.quit()
+            except:
+                pass
+            
+            driver = create_browser()
+            logger.info("Browser restarted")
+            
+            # Navigate to the GST website again
+            driver.get(GST_PORTAL_URL)
+            logger.info("Navigated to GST website after restart")
+        
+        # Handle captcha, entering the PAN while the captcha is solved
+        logger.info("Starting captcha handling process...")
+        if handle_captcha(driver, max_retries=MAX_RETRIES, search_value=pan):
+            logger.info("Captcha solved successfully")
+            
+            # Take a screenshot of the results page; handle_captcha has waited for it to load
+            if DEBUG_SCREENSHOTS:
+                save_page_screenshot(driver, f"results_page_{pan}")
+            
+            # Extract search results
+            results = extract_search_results(driver)
+            
+            # Log the results
+            if TEST_MODE:
+                logger.debug(f"Detailed search results for PAN {pan}:")
+                for idx, result in enumerate(results):
+                    logger.debug(f"  Result {idx+1}: {json.dumps(result, indent=2)}")
+            else:
+                logger.info(f"Search results: {results}")
+            
+            # Log the number of GSTINs found
+            gstin_count = sum(1 for r in results if "GSTIN" in r)
+            logger.info(f"Found {gstin_count} GSTINs for PAN {pan}")
+            
+        else:
+            logger.error(f"Failed to solve captcha for PAN {pan}")
+            results = [{"Result": "Error: Failed to solve captcha"}]
+        
+    except Exception as e:
+        logger.error(f"Error processing PAN {pan}: {e}")
+        results = [{"Result": f"Error: {str(e)}"}]
+        save_page_screenshot(driver, f"error_page_{pan}")
+        return results, recover_browser(driver)
+    
+    # Add a small delay between requests to avoid overloading the server
+    delay = random.uniform(DELAY_BETWEEN_REQUESTS[0], DELAY_BETWEEN_REQUESTS[1])
+    time.sleep(delay)
+    
+    # Get back to an empty form for the next PAN; the results above are kept even if
+    # this fails, it only means the browser needs recovering before the next search
+    try:
+        reset_search_form(driver)
+    except Exception as e:
+        logger.error(f"Error resetting search form after PAN {pan}: {e}")
+        driver = recover_browser(driver)
+    
+    return results, driver
+
+
+def recover_browser(driver):
+    """
+    Get the browser back to the search page after an error, refreshing the page first
+    and restarting the browser if that fails.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        
+    Returns:
+        The driver to use for the next PAN: the same one, a new one if the browser had
+        to be restarted, or None if it could not be
+    """
+    # Try to recover by refreshing the page
+    try:
+        refresh_search_page(driver)
+        return driver
+    except:
+        logger.error("Failed to refresh page after error")
+    
+    # If we can't recover, restart the browser
+    try:
+        driver.quit()
+    except:
+        pass
+    try:
+        driver = create_browser()
+        driver.get(GST_PORTAL_URL)
+        logger.info("Restarted browser after error")
+        return driver
+    except Exception as e:
+        logger.error(f"Failed to restart browser: {e}")
+        return None
+
+
+def pan_worker(worker_id, pan_queue, total, record_result):
+    """
+    Search PANs taken from a shared queue with one browser until the queue is empty.
+    
+    Args:
+        worker_id: Number of this worker, used in log messages
+        pan_queue: Queue of (position, PAN) tuples to search
+        total: Total number of PANs being processed
+        record_result: Called with (pan, results) after each PAN
+    """
+    driver = create_browser()
+    logger.info(f"Worker {worker_id}: Chrome driver initialized successfully")
+    
+    try:
+        # Navigate to the GST portal
+        driver.get(GST_PORTAL_URL)
+        # Wait for the page to load
+        WebDriverWait(driver, 20, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.presence_of_element_located((By.ID, "for_gstin"))
+        )
+        logger.info(f"Worker {worker_id}: Navigated to GST website")
+        
+        while True:
+            try:
+                position, pan = pan_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            logger.info(f"Processing PAN {position}/{total}: {pan}")
+            print(f"Processing PAN {position}/{total}: {pan}")
+            
+            results, driver = process_pan(driver, pan)
+            record_result(pan, results)
+            
+            if driver is None:
+                logger.error(f"Worker {worker_id}: Stopping, browser could not be restarted")
+                break
+    finally:
+        # Close the browser
+        if driver is not None:
+            try:
+                driver.quit()
+                logger.info(f"Worker {worker_id}: Browser closed")
+            except:
+                pass
+
+
+def process_pan_numbers(file_path, headless=False, test_mode=False, limit=None, resume=False, workers=None):
     """
     Process PAN numbers from an Excel file and extract GSTINs from the GST portal.
     Enhanced with batch processing, checkpoints, and two-sheet approach.
@@ -1077,6 +1945,7 @@ def process_pan_numbers(file_path, headless=False, test_mode=False, limit=None,
         test_mode: Whether to run in test mode (process only one PAN)
         limit: Maximum number of unique PAN numbers to process (default: None = process all)
         resume: Whether to resume from a checkpoint
+        workers: Number of browsers searching PANs in parallel (default: None = PAN_WORKERS)
     """
     global TEST_MODE
     TEST_MODE = test_mode
@@ -1092,6 +1961,9 @@ def process_pan_numbers(file_path, headless=False, test_mode=False, limit=None,
         print(f"\nERROR: Excel validation failed: {error_message}")
         return
     
+    # GSTINs already in the GSTIN sheet, kept up to date by update_excel_with_results
+    seen_gstins = set(gstin_df["GSTIN"].dropna().astype(str))
+    
     # Extract PAN data
     pan_numbers, pan_to_index = extract_pan_data(pan_df)
     if not pan_numbers:
@@ -1112,6 +1984,16 @@ def process_pan_numbers(file_path, headless=False, test_mode=False, limit=None,
         pan_numbers = [pan for pan in pan_numbers if pan not in processed_pans]
         logger.info(f"Resuming from checkpoint. {len(processed_pans)} PANs already processed, {len(pan_numbers)} remaining.")
     
+    # Reuse recent results from earlier runs instead of searching those PANs again
+    cache_db = open_pan_cache()
+    if cache_db is not None:
+        cached_results = load_cached_results(cache_db, pan_numbers)
+        if cached_results:
+            results_dict.update(cached_results)
+            processed_pans.extend(cached_results)
+            pan_numbers = [pan for pan in pan_numbers if pan not in cached_results]
+            logger.info(f"Using cached results for {len(cached_results)} PANs, {len(pan_numbers)} remaining.")
+    
     # In test mode, only process the first PAN
     if test_mode and len(pan_numbers) > 1:
         first_pan = pan_numbers[0]
@@ -1130,167 +2012,45 @@ def process_pan_numbers(file_path, headless=False, test_mode=False, limit=None,
         
         # Update Excel file with existing results
         if results_dict:
-            update_excel_with_results(file_path, pan_df, gstin_df, results_dict)
+            pan_df, gstin_df = update_excel_with_results(file_path, pan_df, gstin_df, results_dict, seen_gstins)
+        if cache_db is not None:
+            cache_db.close()
         return
     
     logger.info(f"Starting processing of {len(pan_numbers)} PAN numbers")
     print(f"\nProcessing {len(pan_numbers)} PAN numbers...")
     
-    # Set up Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.binary_location = "/usr/bin/chromium"
+    # Start this run's checkpoint from a fresh snapshot, which also clears any old log
+    save_checkpoint(processed_pans, results_dict)
     
-    service = Service('/usr/bin/chromedriver')
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.implicitly_wait(10)
-    logger.info("Chrome driver initialized successfully")
+    # Workers take PANs from this queue until it is empty
+    pan_queue = queue.Queue()
+    for position, pan in enumerate(pan_numbers, 1):
+        pan_queue.put((position, pan))
+    
+    # Results from all workers are recorded under this lock
+    results_lock = threading.Lock()
+    
+    def record_result(pan, results):
+        """Record the results for one PAN and append them to the checkpoint log"""
+        with results_lock:
+            results_dict[pan] = results
+            processed_pans.append(pan)
+            append_checkpoint([pan], results_dict)
+            if cache_db is not None:
+                cache_results(cache_db, pan, results)
+    
+    worker_count = max(1, min(workers or PAN_WORKERS, len(pan_numbers)))
+    logger.info(f"Searching PANs with {worker_count} browser(s)")
     
     try:
-        # Navigate to the GST portal
-        driver.get(GST_PORTAL_URL)
-        # Wait for the page to load
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.ID, "for_gstin"))
-        )
-        logger.info("Navigated to GST website")
-        
-        # Process PANs in batches
-        batch_count = 0
-        current_batch = []
-        batch_results = {}
-        
-        for i, pan in enumerate(pan_numbers):
-            try:
-                logger.info(f"Processing PAN {i+1}/{len(pan_numbers)}: {pan}")
-                print(f"Processing PAN {i+1}/{len(pan_numbers)}: {pan}")
-                
-                # Check if browser is still responsive
-                try:
-                    current_url = driver.current_url
-                except Exception as e:
-                    logger.error(f"Browser connection lost: {e}")
-                    logger.info("Restarting browser...")
-                    
-                    # Restart the browser
-                    try:
-                        driver.quit()
-                    except:
-                        pass
-                    
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
-                    driver.implicitly_wait(10)
-                    logger.info("Browser restarted")
-                    
-                    # Navigate to the GST website again
-                    driver.get(GST_PORTAL_URL)
-                    logger.info("Navigated to GST website after restart")
-                
-                # Clear any existing value and enter the PAN
-                pan_input = driver.find_element(By.ID, "for_gstin")
-                pan_input.clear()
-                pan_input.send_keys(pan)
-                logger.info(f"Entered PAN: {pan}")
-                
-                # Handle captcha
-                logger.info("Starting captcha handling process...")
-                if handle_captcha(driver, max_retries=MAX_RETRIES):
-                    logger.info("Captcha solved successfully")
-                    
-                    # Wait for results to load
-                    time.sleep(5)
-                    
-                    # Take a screenshot of the results page
-                    screenshot_path = os.path.join(SCREENSHOT_DIR, f"results_page_{pan}_{int(time.time())}.png")
-                    driver.save_screenshot(screenshot_path)
-                    logger.info(f"Saved results page screenshot to {screenshot_path}")
-                    
-                    # Extract search results
-                    results = extract_search_results(driver)
-                    
-                    # Log the results
-                    if TEST_MODE:
-                        logger.debug(f"Detailed search results for PAN {pan}:")
-                        for idx, result in enumerate(results):
-                            logger.debug(f"  Result {idx+1}: {json.dumps(result, indent=2)}")
-                    else:
-                        logger.info(f"Search results: {results}")
-                    
-                    # Log the number of GSTINs found
-                    gstin_count = sum(1 for r in results if "GSTIN" in r)
-                    logger.info(f"Found {gstin_count} GSTINs for PAN {pan}")
-                    
-                    # Add to batch results
-                    batch_results[pan] = results
-                    current_batch.append(pan)
-                    
-                    # Add to overall results
-                    results_dict[pan] = results
-                    processed_pans.append(pan)
-                    
-                else:
-                    logger.error(f"Failed to solve captcha for PAN {pan}")
-                    batch_results[pan] = [{"Result": "Error: Failed to solve captcha"}]
-                    current_batch.append(pan)
-                    
-                    # Add to overall results
-                    results_dict[pan] = [{"Result": "Error: Failed to solve captcha"}]
-                    processed_pans.append(pan)
-                
-                # Check if we've reached the batch size or the end of the list
-                batch_count += 1
-                if batch_count >= BATCH_SIZE or i == len(pan_numbers) - 1:
-                    logger.info(f"Completed batch of {len(current_batch)} PANs")
-                    
-                    # Save checkpoint
-                    save_checkpoint(processed_pans, results_dict)
-                    
-                    # Reset batch
-                    batch_count = 0
-                    current_batch = []
-                    batch_results = {}
-                
-                # Add a small delay between requests to avoid overloading the server
-                delay = random.uniform(DELAY_BETWEEN_REQUESTS[0], DELAY_BETWEEN_REQUESTS[1])
-                time.sleep(delay)
-                
-                # Navigate back or refresh to get to the form again
-                driver.refresh()
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error processing PAN {pan}: {e}")
-                
-                # Add error result to batch
-                batch_results[pan] = [{"Result": f"Error: {str(e)}"}]
-                current_batch.append(pan)
-                
-                # Add to overall results
-                results_dict[pan] = [{"Result": f"Error: {str(e)}"}]
-                processed_pans.append(pan)
-                
-                # Try to recover by refreshing the page
-                try:
-                    driver.refresh()
-                    time.sleep(2)
-                except:
-                    logger.error("Failed to refresh page after error")
-                    
-                    # If we can't recover, restart the browser
-                    try:
-                        driver.quit()
-                        driver = webdriver.Chrome(service=service, options=chrome_options)
-                        driver.get(GST_PORTAL_URL)
-                        logger.info("Restarted browser after error")
-                    except Exception as e2:
-                        logger.error(f"Failed to restart browser: {e2}")
-                        break
-        
-        # Update Excel file with all results
-        update_excel_with_results(file_path, pan_df, gstin_df, results_dict)
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="pan-worker") as executor:
+            futures = [
+                executor.submit(pan_worker, worker_id, pan_queue, len(pan_numbers), record_result)
+                for worker_id in range(1, worker_count + 1)
+            ]
+            for future in futures:
+                future.result()
         
         logger.info(f"Processing complete. Successfully processed {len(processed_pans)} PAN numbers.")
         print(f"\nProcessing complete. Successfully processed {len(processed_pans)} PAN numbers.")
@@ -1300,32 +2060,105 @@ def process_pan_numbers(file_path, headless=False, test_mode=False, limit=None,
         print(f"\nERROR: Unexpected error: {e}")
     
     finally:
-        # Close the browser
-        try:
-            driver.quit()
-            logger.info("Browser closed")
-        except:
-            pass
-        
-        # Final update to Excel file if there are any results
+        # Write all results to the Excel file once, whether or not the run completed;
+        # the checkpoint log covers a crash before this point
         if results_dict:
             try:
-                update_excel_with_results(file_path, pan_df, gstin_df, results_dict)
+                pan_df, gstin_df = update_excel_with_results(file_path, pan_df, gstin_df, results_dict, seen_gstins)
                 logger.info("Final update to Excel file completed")
             except Exception as e:
                 logger.error(f"Error during final Excel update: {e}")
                 print(f"\nERROR: Failed to update Excel file: {e}")
         
+        if cache_db is not None:
+            cache_db.close()
+        
         print(f"\nProcessing complete. Results have been saved to the file.")
         print(f"File location: {file_path}")
 # ===== GSTIN DETAILS FUNCTIONS =====
 
-def get_gstin_details(gstin):
+def create_gstin_browser():
+    """
+    Start a Chrome driver for looking up GSTIN details.
+    
+    Returns:
+        WebDriver: The new Chrome driver
+    """
+    # Set up Chrome options
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--disable-popup-blocking")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--no-sandbox")
+    enable_network_log(chrome_options)
+    
+    driver = webdriver.Chrome(service=Service(get_chromedriver_path()), options=chrome_options)
+    logger.info("Chrome driver initialized successfully")
+    return driver
+
+
+class GstinBrowsers:
+    """
+    Chrome drivers shared by the GSTIN lookups of one batch: each thread starts its own
+    on its first lookup and keeps it for the next ones, so a batch pays for one browser
+    start per thread instead of one per GSTIN. Drivers are not shared between threads.
+    """
+    
+    def __init__(self):
+        self.local = threading.local()
+        self.drivers = []
+        self.lock = threading.Lock()
+    
+    def get(self):
+        """Get the calling thread's driver, starting it on first use"""
+        driver = getattr(self.local, "driver", None)
+        if driver is None:
+            driver = self.local.driver = create_gstin_browser()
+            with self.lock:
+                self.drivers.append(driver)
+        return driver
+    
+    def discard(self):
+        """Quit the calling thread's driver, e.g. after an error; the next lookup starts a new one"""
+        driver = getattr(self.local, "driver", None)
+        if driver is None:
+            return
+        self.local.driver = None
+        with self.lock:
+            self.drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    def close(self):
+        """Quit every driver started for this batch"""
+        with self.lock:
+            drivers = list(self.drivers)
+            self.drivers.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        logger.info(f"Closed {len(drivers)} GSTIN lookup browsers")
+
+
+def get_gstin_details(gstin, browsers=None, rate_limiter=None):
     """
     Get details for a specific GSTIN from the GST portal.
     
     Args:
         gstin: The GSTIN to search for
+        browsers: Optional GstinBrowsers to take the calling thread's driver from; by
+                  default a browser is started for this lookup and closed afterwards
+        rate_limiter: Optional limiter whose acquire() is waited on before every page
+                      load for this lookup, including captcha retries
         
     Returns:
         dict: Dictionary containing GSTIN details (Trade name, Date of registration, HSN)
@@ -1338,54 +2171,42 @@ def get_gstin_details(gstin):
         logger.error(f"Invalid GSTIN format: {gstin}")
         return {"error": "Invalid GSTIN format", "gstin": gstin}
     
-    # Set up Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-infobars")
-    chrome_options.add_argument("--disable-popup-blocking")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--no-sandbox")
-    
     # Initialize the browser
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-        driver.implicitly_wait(10)
-        logger.info("Chrome driver initialized successfully")
+        driver = browsers.get() if browsers is not None else create_gstin_browser()
     except Exception as e:
         logger.error(f"Error initializing Chrome driver: {e}")
         return {"error": f"Failed to initialize Chrome driver: {str(e)}", "gstin": gstin}
     
+    failed = False
     try:
         # Navigate to the GST portal
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         driver.get(GST_GSTIN_SEARCH_URL)
         # Wait for the page to load
-        WebDriverWait(driver, 20).until(
+        WebDriverWait(driver, 20, poll_frequency=WAIT_POLL_INTERVAL).until(
             EC.presence_of_element_located((By.ID, "for_gstin"))
         )
         logger.info("Navigated to GST GSTIN search website")
         
-        # Clear any existing value and enter the GSTIN
-        gstin_input = driver.find_element(By.ID, "for_gstin")
-        gstin_input.clear()
-        gstin_input.send_keys(gstin)
-        logger.info(f"Entered GSTIN: {gstin}")
-        
-        # Handle captcha
+        # Handle captcha, entering the GSTIN while the captcha is solved
         logger.info("Starting captcha handling process...")
-        if handle_captcha(driver, max_retries=MAX_RETRIES):
+        if handle_captcha(driver, max_retries=MAX_RETRIES, search_value=gstin, rate_limiter=rate_limiter):
             logger.info("Captcha solved successfully")
             
-            # Wait for results to load
-            time.sleep(5)
+            # Wait for the details, or the portal's answer that there are none
+            try:
+                page_wait(driver).until(EC.any_of(
+                    EC.presence_of_element_located((By.XPATH, "//td[contains(text(), 'Trade Name')]")),
+                    EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'No records found')]"))
+                ))
+            except TimeoutException:
+                logger.warning("GSTIN details did not appear, extracting what is on the page")
             
             # Take a screenshot of the results page
-            screenshot_path = os.path.join(SCREENSHOT_DIR, f"results_page_{gstin}_{int(time.time())}.png")
-            driver.save_screenshot(screenshot_path)
-            logger.info(f"Saved results page screenshot to {screenshot_path}")
+            if DEBUG_SCREENSHOTS:
+                save_page_screenshot(driver, f"results_page_{gstin}")
             
             # Extract GSTIN details
             details = extract_gstin_details(driver, gstin)
@@ -1400,14 +2221,73 @@ def get_gstin_details(gstin):
             
     except Exception as e:
         logger.error(f"Error getting details for GSTIN {gstin}: {e}")
+        save_page_screenshot(driver, f"error_page_{gstin}")
+        failed = True
         return {"error": str(e), "gstin": gstin}
     finally:
-        # Close the browser
-        try:
-            driver.quit()
-            logger.info("Browser closed")
-        except:
-            pass
+        if browsers is not None:
+            # Keep the thread's browser for its next lookup unless it may be broken
+            if failed:
+                browsers.discard()
+        else:
+            # Close the browser
+            try:
+                driver.quit()
+                logger.info("Browser closed")
+            except:
+                pass
+
+# Returns the trade name, registration date and HSN codes of a GSTIN details page,
+# and whether the portal is showing "No records found" instead.
+# A field is the cell after the <td> whose own text holds its label (null when there
+# is none); HSN codes fall back to the first column of a table with an HSN header.
+GSTIN_DETAILS_SCRIPT = """
+function ownText(el) {
+    for (var node = el.firstChild; node; node = node.nextSibling) {
+        if (node.nodeType === Node.TEXT_NODE) return node.nodeValue;
+    }
+    return '';
+}
+var cells = Array.from(document.querySelectorAll('td'));
+function cellsAfter(label) {
+    var values = [];
+    cells.forEach(function (cell) {
+        if (ownText(cell).indexOf(label) === -1) return;
+        for (var el = cell.nextElementSibling; el; el = el.nextElementSibling) {
+            if (el.tagName === 'TD') values.push(el.innerText.trim());
+        }
+    });
+    return values;
+}
+function firstAfter(label) {
+    var values = cellsAfter(label);
+    return values.length ? values[0] : null;
+}
+var hsnCodes = cellsAfter('HSN');
+var hsnSource = hsnCodes.length ? 'cells' : null;
+if (!hsnCodes.length) {
+    var hsnTable = Array.from(document.querySelectorAll('table')).find(function (table) {
+        return (table.getAttribute('class') || '').indexOf('table') !== -1 &&
+            Array.from(table.querySelectorAll('th')).some(function (th) {
+                return ownText(th).indexOf('HSN') !== -1;
+            });
+    });
+    if (hsnTable) {
+        hsnSource = 'table';
+        Array.from(hsnTable.querySelectorAll('tr')).slice(1).forEach(function (row) {
+            var cell = row.querySelector('td');
+            if (cell) hsnCodes.push(cell.innerText.trim());
+        });
+    }
+}
+return {
+    no_records: document.body.innerText.indexOf('No records found') !== -1,
+    trade_name: firstAfter('Trade Name'),
+    registration_date: firstAfter('Date of Registration'),
+    hsn_codes: hsnCodes,
+    hsn_source: hsnSource
+};
+"""
 
 def extract_gstin_details(driver, gstin):
     """
@@ -1421,13 +2301,11 @@ def extract_gstin_details(driver, gstin):
         dict: Dictionary containing GSTIN details
     """
     try:
-        # Take a screenshot of the results page for debugging
-        screenshot_path = os.path.join(SCREENSHOT_DIR, f"gstin_details_{gstin}_{int(time.time())}.png")
-        driver.save_screenshot(screenshot_path)
-        logger.info(f"Saved GSTIN details page screenshot to {screenshot_path}")
+        # Read every field in one call instead of a WebDriver round-trip per cell
+        scraped = driver.execute_script(GSTIN_DETAILS_SCRIPT)
         
         # Check if "No records found" message is present
-        if "No records found" in driver.page_source:
+        if scraped["no_records"]:
             logger.info("No records found message detected")
             return {"error": "No records found", "gstin": gstin}
         
@@ -1444,48 +2322,33 @@ def extract_gstin_details(driver, gstin):
         }
         
         # Extract trade name
-        try:
-            trade_name_element = driver.find_element(By.XPATH, "//td[contains(text(), 'Trade Name')]/following-sibling::td")
-            trade_name = trade_name_element.text.strip()
+        trade_name = scraped["trade_name"]
+        if trade_name is not None:
             details["trade_name"] = trade_name
             details["Trade_Name"] = trade_name
             logger.info(f"Extracted trade name: {trade_name}")
-        except Exception as e:
-            logger.warning(f"Could not extract trade name: {e}")
+        else:
+            logger.warning("Could not extract trade name: no 'Trade Name' cell on the page")
         
         # Extract registration date
-        try:
-            reg_date_element = driver.find_element(By.XPATH, "//td[contains(text(), 'Date of Registration')]/following-sibling::td")
-            reg_date = reg_date_element.text.strip()
+        reg_date = scraped["registration_date"]
+        if reg_date is not None:
             details["registration_date"] = reg_date
             details["Registration_Date"] = reg_date
             logger.info(f"Extracted registration date: {reg_date}")
-        except Exception as e:
-            logger.warning(f"Could not extract registration date: {e}")
+        else:
+            logger.warning("Could not extract registration date: no 'Date of Registration' cell on the page")
         
         # Extract HSN codes
-        try:
-            hsn_elements = driver.find_elements(By.XPATH, "//td[contains(text(), 'HSN')]/following-sibling::td")
-            if hsn_elements:
-                for element in hsn_elements:
-                    hsn_code = element.text.strip()
-                    if hsn_code and hsn_code not in details["hsn_codes"]:
-                        details["hsn_codes"].append(hsn_code)
-                logger.info(f"Extracted HSN codes: {details['hsn_codes']}")
-            else:
-                # Try alternative approach for HSN codes
-                hsn_table = driver.find_element(By.XPATH, "//table[contains(@class, 'table') and .//th[contains(text(), 'HSN')]]")
-                if hsn_table:
-                    rows = hsn_table.find_elements(By.TAG_NAME, "tr")
-                    for row in rows[1:]:  # Skip header row
-                        cells = row.find_elements(By.TAG_NAME, "td")
-                        if cells and len(cells) > 0:
-                            hsn_code = cells[0].text.strip()
-                            if hsn_code and hsn_code not in details["hsn_codes"]:
-                                details["hsn_codes"].append(hsn_code)
-                    logger.info(f"Extracted HSN codes (alternative): {details['hsn_codes']}")
-        except Exception as e:
-            logger.warning(f"Could not extract HSN codes: {e}")
+        for hsn_code in scraped["hsn_codes"]:
+            if hsn_code and hsn_code not in details["hsn_codes"]:
+                details["hsn_codes"].append(hsn_code)
+        if scraped["hsn_source"] == "cells":
+            logger.info(f"Extracted HSN codes: {details['hsn_codes']}")
+        elif scraped["hsn_source"] == "table":
+            logger.info(f"Extracted HSN codes (alternative): {details['hsn_codes']}")
+        else:
+            logger.warning("Could not extract HSN codes: no HSN cells or table on the page")
         
         # Convert HSN codes list to string for Excel storage
         if details["hsn_codes"]:
@@ -1494,6 +2357,7 @@ def extract_gstin_details(driver, gstin):
         return details
     except Exception as e:
         logger.error(f"Error extracting GSTIN details: {e}")
+        save_page_screenshot(driver, f"gstin_details_{gstin}")
         return {"error": str(e), "gstin": gstin}
 
 # ===== MAIN FUNCTION =====
@@ -1507,10 +2371,13 @@ def main():
     parser.add_argument("--test", "-t", action="store_true", help="Run in test mode (process only one PAN with detailed logging)")
     parser.add_argument("--limit", "-l", type=int, help="Maximum number of unique PAN numbers to process")
     parser.add_argument("--resume", "-r", action="store_true", help="Resume from checkpoint")
+    parser.add_argument("--workers", "-w", type=int, help=f"Number of browsers searching PANs in parallel (default: {PAN_WORKERS})")
     
     # Parse arguments
     args = parser.parse_args()
     
+    workers = args.workers
+    
     # If no arguments provided, use interactive mode
     if len(sys.argv) == 1:
         print("=" * 70)
@@ -1566,7 +2433,10 @@ def main():
     if resume:
         print("Resuming from checkpoint")
     
-    process_pan_numbers(file_path, headless, test_mode, limit, resume)
+    if workers:
+        print(f"Searching with {workers} browsers in parallel")
+    
+    process_pan_numbers(file_path, headless, test_mode, limit, resume, workers)
 
 
 if __name__ == "__main__":
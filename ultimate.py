@@ -1,9 +1,16 @@
+import os
+import sqlite3
 import time
+import threading
+from functools import partial
+import openpyxl
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
@@ -20,27 +27,70 @@ logging.basicConfig(
 logger = logging.getLogger()
 logger.addHandler(logging.StreamHandler())
 
+# Number of Chrome browsers scraping SignalX in parallel
+SIGNALX_WORKERS = int(os.environ.get('SIGNALX_WORKERS', 4))
+# Tabs per browser; each tab is driven by its own worker thread
+SIGNALX_TABS = int(os.environ.get('SIGNALX_TABS', 1))
+SIGNALX_URL = "https://signalx.ai/gst-verification-2/"
+# Installed Chrome and chromedriver; when unset, Selenium Manager looks them up on every browser start
+CHROME_BIN = os.environ.get('CHROME_BIN')
+CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH')
+# Longest wait in seconds for the page, and seconds between checks while waiting
+PAGE_WAIT_TIMEOUT = 8
+WAIT_POLL_INTERVAL = 0.2
+# Attempts per GSTIN when a worker's browser crashes
+MAX_RETRIES = 2
+# Scraped details by GSTIN, reused across runs so a rerun or resume skips finished GSTINs
+GSTIN_CACHE_DB = "gstin_cache.db"
+GSTIN_CACHE_TTL = int(os.environ.get('GSTIN_CACHE_TTL_HOURS', 24 * 7)) * 3600
+# Cache writes are committed in batches of this many GSTINs
+CACHE_COMMIT_EVERY = 50
+
+# Each worker thread owns one tab of a shared browser; all browsers are quit once the run ends
+worker_state = threading.local()
+browsers = []
+browsers_lock = threading.Lock()
+
 
 # -----------------------------------
 # Step 2: Initialize Selenium Driver
 # -----------------------------------
+# Subresources the lookup never needs (images, stylesheets, fonts, trackers);
+# Chrome drops these requests before they are sent
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp',
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+    '*google-analytics*', '*googletagmanager*', '*gtag*', '*doubleclick*', '*hotjar*', '*facebook*',
+]
+# Content settings: 2 blocks the content type
+CONTENT_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.managed_default_content_settings.stylesheets': 2,
+    'profile.managed_default_content_settings.fonts': 2,
+}
+
+
 def setup_driver():
     options = Options()
+    if CHROME_BIN:
+        options.binary_location = CHROME_BIN
     options.add_argument('--headless=new')
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
     # Speed optimizations
-    options.add_argument('--disable-images')
-    options.add_argument('--disable-plugins')
+    # Return from driver.get at DOMContentLoaded; the waits target the elements we need
+    options.page_load_strategy = 'eager'
+    options.add_experimental_option('prefs', CONTENT_PREFS)
     options.add_argument('--disable-extensions')
     options.add_argument('--disable-web-security')
     options.add_argument('--disable-features=VizDisplayCompositor')
     options.add_argument('--disable-ipc-flooding-protection')
     try:
-        driver = webdriver.Chrome(options=options)
+        driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
         driver.set_page_load_timeout(10)  # Reduced from 30
-        driver.implicitly_wait(2)  # Add implicit wait
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
         logger.info("Chrome WebDriver launched successfully.")
         return driver
     except Exception as e:
@@ -51,31 +101,89 @@ def setup_driver():
 # ------------------------------------------------
 # Step 3: Extract GSTIN Data from SignalX Website
 # ------------------------------------------------
-def extract_info_by_gstin(driver, gstin):
-    logger.info(f"Processing GSTIN: {gstin}")
-    try:
-        driver.get("https://signalx.ai/gst-verification-2/")
+# Fill the GSTIN field in place and blank the previous result (fields and HSN
+# table) so the next wait only succeeds once SignalX has rendered the new one
+FILL_GSTIN_SCRIPT = """
+const field = document.getElementById('gstinField');
+field.value = arguments[0];
+field.dispatchEvent(new Event('input', {bubbles: true}));
+document.querySelectorAll('h6 ~ p').forEach(p => { p.textContent = ''; });
+document.querySelectorAll('table tbody').forEach(body => body.replaceChildren());
+"""
+
+# Read the trade name, registration date and HSN codes in one call: each field is
+# the first <p> after the <h6> whose own text holds the label
+RESULTS_SCRIPT = """
+function ownText(el) {
+    for (var node = el.firstChild; node; node = node.nextSibling) {
+        if (node.nodeType === Node.TEXT_NODE) return node.nodeValue;
+    }
+    return '';
+}
+function valueAfter(label) {
+    var headings = document.querySelectorAll('h6');
+    for (var i = 0; i < headings.length; i++) {
+        if (ownText(headings[i]).indexOf(label) === -1) continue;
+        for (var el = headings[i].nextElementSibling; el; el = el.nextElementSibling) {
+            if (el.tagName === 'P') return el.innerText.trim();
+        }
+    }
+    return '';
+}
+return {
+    trade_name: valueAfter('Trade Name'),
+    reg_date: valueAfter('Effective Date of registration'),
+    hsn_codes: Array.from(document.querySelectorAll('table tbody tr > td:first-child'))
+        .map(function (cell) { return cell.innerText.trim(); })
+        .filter(Boolean)
+};
+"""
+
+
+def open_search_page(driver):
+    driver.get(SIGNALX_URL)
+    WebDriverWait(driver, PAGE_WAIT_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL).until(
+        EC.presence_of_element_located((By.ID, "gstinField"))
+    )
+
+
+def read_rendered_results(driver):
+    # Polled until the registration date is filled in; the same call returns every field
+    data = driver.execute_script(RESULTS_SCRIPT)
+    if not data['reg_date']:
+        return False
+    return data['trade_name'], data['reg_date'], ', '.join(data['hsn_codes'])
+
+
+def submit_gstin(driver, gstin):
+    # The search page stays loaded between GSTINs; only reload it if it is gone
+    if not driver.find_elements(By.ID, "gstinField"):
+        open_search_page(driver)
+    driver.execute_script(FILL_GSTIN_SCRIPT, gstin)
+
 
-        wait = WebDriverWait(driver, 8)  # Reduced from 20
+def click_check_details(driver):
+    driver.find_element(By.ID, "checkDetailsButton").click()
 
+
+def wait_in_tab(run_in_tab, condition):
+    # Poll the condition in the tab without holding the browser between polls,
+    # so the other tabs can send their commands while this one waits
+    return run_in_tab.wait.until(lambda run: run(condition))
+
+
+def extract_info_by_gstin(run_in_tab, gstin):
+    logger.info(f"Processing GSTIN: {gstin}")
+    try:
         # Enter GSTIN
-        input_box = wait.until(EC.presence_of_element_located((By.ID, "gstinField")))
-        input_box.clear()
-        input_box.send_keys(gstin)
+        run_in_tab(submit_gstin, gstin)
 
         # Click button - simplified since we know the correct selector
-        check_button = wait.until(EC.element_to_be_clickable((By.ID, "checkDetailsButton")))
-        check_button.click()
-
-        # Wait for results and extract data
-        wait.until(EC.presence_of_element_located(
-            (By.XPATH, "//h6[contains(text(),'Effective Date of registration')]/following-sibling::p")
-        ))
+        wait_in_tab(run_in_tab, EC.element_to_be_clickable((By.ID, "checkDetailsButton")))
+        run_in_tab(click_check_details)
 
-        trade_name = driver.find_element(By.XPATH, "//h6[contains(text(),'Trade Name')]/following-sibling::p").text.strip()
-        reg_date = driver.find_element(By.XPATH, "//h6[contains(text(),'Effective Date of registration')]/following-sibling::p").text.strip()
-        hsn_elements = driver.find_elements(By.XPATH, "//table//tbody//tr/td[1]")
-        hsn_codes = ', '.join([el.text.strip() for el in hsn_elements if el.text.strip()])
+        # Wait for this GSTIN's results and extract data
+        trade_name, reg_date, hsn_codes = wait_in_tab(run_in_tab, read_rendered_results)
 
         logger.info(f"Extracted data for {gstin}")
         return gstin, trade_name, reg_date, hsn_codes
@@ -90,41 +198,252 @@ def extract_info_by_gstin(driver, gstin):
     return gstin, "", "", ""
 
 
+# ---------------------------------------------------
+# Step 4: Worker Pool (browsers shared through tabs)
+# ---------------------------------------------------
+def driver_alive(driver):
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+
+class Browser:
+    # One Chrome session whose tabs are driven by several worker threads.
+    # chromedriver handles one command at a time per session, so each command
+    # runs under the lock after switching to the calling worker's tab.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.driver = None
+        self.handles = {}
+        self.current = None
+        self.generation = 0
+        self.claimed = 0
+
+    def _open_tab(self, index, first):
+        if not first:
+            self.driver.switch_to.new_window('tab')
+        self.handles[index] = self.current = self.driver.current_window_handle
+        # Load the search page once; each lookup then reuses it
+        try:
+            open_search_page(self.driver)
+        except WebDriverException as e:
+            logger.error(f"Failed to open SignalX search page: {e}")
+
+    def open_tab(self, index):
+        with self.lock:
+            first = self.driver is None
+            if first:
+                self.driver = setup_driver()
+            self._open_tab(index, first)
+
+    def run(self, index, fn, *args):
+        with self.lock:
+            # A failed restart leaves no driver; report it like a crashed browser so
+            # the next worker's lookup retries the restart instead of the run aborting
+            if self.driver is None:
+                raise WebDriverException("Browser is not running")
+            handle = self.handles[index]
+            if self.current != handle:
+                self.driver.switch_to.window(handle)
+                self.current = handle
+            return fn(self.driver, *args)
+
+    def tab_alive(self, index):
+        try:
+            return self.run(index, driver_alive)
+        except WebDriverException:
+            return False
+
+    def restart(self, generation):
+        with self.lock:
+            # Another tab's worker already replaced the crashed browser
+            if generation != self.generation:
+                return
+            self.quit_driver()
+            self.driver = setup_driver()
+            for n, index in enumerate(sorted(self.handles)):
+                self._open_tab(index, n == 0)
+            self.generation += 1
+
+    def quit_driver(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+def init_worker():
+    # Claim a tab in a browser with room left, or start a new browser
+    with browsers_lock:
+        browser = next((b for b in browsers if b.claimed < SIGNALX_TABS), None)
+        if browser is None:
+            browser = Browser()
+            browsers.append(browser)
+        index = browser.claimed
+        browser.claimed += 1
+    browser.open_tab(index)
+    worker_state.browser = browser
+    worker_state.index = index
+    run_in_tab = partial(browser.run, index)
+    # One wait per tab, reused for every lookup the worker makes
+    run_in_tab.wait = WebDriverWait(run_in_tab, PAGE_WAIT_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL)
+    worker_state.run_in_tab = run_in_tab
+
+
+def scrape_one(gstin):
+    browser, index = worker_state.browser, worker_state.index
+    for attempt in range(1, MAX_RETRIES + 1):
+        generation = browser.generation
+        result = extract_info_by_gstin(worker_state.run_in_tab, gstin)
+        if any(result[1:]) or browser.tab_alive(index):
+            return result
+        # The browser died mid-lookup: replace it so this worker keeps going
+        logger.warning(f"Browser crashed on GSTIN {gstin} (attempt {attempt}/{MAX_RETRIES}), restarting it")
+        try:
+            browser.restart(generation)
+        except Exception as e:
+            logger.error(f"Could not restart browser: {e}")
+            break
+    return gstin, "", "", ""
+
+
+def quit_browsers():
+    with browsers_lock:
+        running = list(browsers)
+        browsers.clear()
+    for browser in running:
+        with browser.lock:
+            browser.quit_driver()
+
+
+# -------------------------------
+# Step 5: Cache of GSTIN Details
+# -------------------------------
+def create_cache_table(cache_db):
+    with cache_db:
+        cache_db.execute(
+            "CREATE TABLE IF NOT EXISTS gstin_cache "
+            "(gstin TEXT PRIMARY KEY, trade_name TEXT, reg_date TEXT, hsn_codes TEXT, updated_at INTEGER)"
+        )
+
+
+def open_gstin_cache():
+    try:
+        cache_db = sqlite3.connect(GSTIN_CACHE_DB)
+        cache_db.execute("PRAGMA journal_mode=WAL")
+        cache_db.execute("PRAGMA synchronous=NORMAL")
+        create_cache_table(cache_db)
+        return cache_db
+    except Exception as e:
+        # Results still stream into a cache, it just does not outlive this run
+        logger.error(f"Error opening GSTIN cache, keeping results in memory: {e}")
+        cache_db = sqlite3.connect(":memory:")
+        create_cache_table(cache_db)
+        return cache_db
+
+
+def load_cached_details(cache_db, gstins):
+    cached = {}
+    cutoff = int(time.time()) - GSTIN_CACHE_TTL
+    try:
+        # SQLite limits the number of parameters in one query, so look GSTINs up in chunks
+        for start in range(0, len(gstins), 500):
+            chunk = gstins[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = cache_db.execute(
+                "SELECT gstin, trade_name, reg_date, hsn_codes FROM gstin_cache "
+                f"WHERE updated_at >= ? AND gstin IN ({placeholders})",
+                [cutoff, *chunk]
+            )
+            for row in rows:
+                cached[row[0]] = row
+    except Exception as e:
+        logger.error(f"Error reading GSTIN cache: {e}")
+    return cached
+
+
+def cache_details(cache_db, result):
+    # Lookups that came back empty are not cached, so the next run tries them again
+    if not any(result[1:]):
+        return
+    try:
+        cache_db.execute(
+            "INSERT OR REPLACE INTO gstin_cache (gstin, trade_name, reg_date, hsn_codes, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (*result, int(time.time()))
+        )
+    except Exception as e:
+        logger.error(f"Error caching details for GSTIN {result[0]}: {e}")
+
+
 # --------------------------------------------
-# Step 4: Process Excel File and Write Output
+# Step 6: Process Excel File and Write Output
 # --------------------------------------------
-def update_excel_with_gst_details(input_excel, output_excel):
+def write_excel(df, output_excel):
+    # openpyxl's write-only mode streams rows to disk instead of keeping a cell
+    # object per value in memory; empty cells are NaN in pandas and None here
+    values = df.to_numpy(dtype=object)
+    values[pd.isna(values)] = None
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append([str(col) for col in df.columns])
+    for row in values.tolist():
+        sheet.append(row)
+    workbook.save(output_excel)
+
+
+def update_excel_with_gst_details(input_excel, output_excel, workers=SIGNALX_WORKERS):
     logger.info(f"Reading input file: {input_excel}")
     df = pd.read_excel(input_excel)
 
     gstins = df['GSTIN'].dropna().astype(str).str.strip().tolist()
-    logger.info(f"Total GSTINs found: {len(gstins)}")
+    # A GSTIN can appear on several rows; look each one up once, keeping input order
+    unique_gstins = list(dict.fromkeys(gstins))
+    logger.info(f"Total GSTINs found: {len(gstins)} ({len(unique_gstins)} unique)")
 
-    # Single driver instance for all GSTINs
-    driver = setup_driver()
-    
-    results = []
-    for idx, gstin in enumerate(gstins, 1):
-        logger.info(f"Processing {idx}/{len(gstins)}: {gstin}")
-        result = extract_info_by_gstin(driver, gstin)
-        results.append(result)
+    # Scraped details go straight to the cache as they arrive and the result table
+    # is read back from it at the end, so nothing piles up in memory during the run
+    cache_db = open_gstin_cache()
+    cached = load_cached_details(cache_db, unique_gstins)
+    pending = [gstin for gstin in unique_gstins if gstin not in cached]
+    logger.info(f"{len(cached)} GSTINs found in cache, {len(pending)} to scrape")
 
-    driver.quit()
-    logger.info("WebDriver closed.")
+    # Each worker thread drives one browser tab; map keeps results in input order
+    threads = max(1, min(workers * SIGNALX_TABS, len(pending)))
+    logger.info(f"Scraping with {threads} tabs across up to {workers} browsers")
+    try:
+        with ThreadPoolExecutor(max_workers=threads, initializer=init_worker) as pool:
+            for done, result in enumerate(pool.map(scrape_one, pending), 1):
+                cache_details(cache_db, result)
+                if done % CACHE_COMMIT_EVERY == 0:
+                    cache_db.commit()
+    finally:
+        quit_browsers()
+        logger.info("WebDriver closed.")
+        cache_db.commit()
 
     logger.info("Merging results into dataframe...")
-    result_df = pd.DataFrame(results, columns=['GSTIN', 'Trade_Name', 'Registration_Date', 'HSN_Codes'])
-    df = df.drop(columns=['Trade_Name', 'Registration_Date', 'HSN_Codes'], errors='ignore')
-    df = df.merge(result_df, on='GSTIN', how='left')
+    details = {row[0]: row[1:] for row in load_cached_details(cache_db, unique_gstins).values()}
+    cache_db.close()
+    # Look each row's GSTIN up in the results instead of joining two frames; the
+    # detail columns are overwritten in place, or added at the end if missing
+    columns = ['Trade_Name', 'Registration_Date', 'HSN_Codes']
+    missing = (None, None, None)
+    keys = df['GSTIN'].astype(str).str.strip()
+    df[columns] = pd.DataFrame([details.get(key, missing) for key in keys], index=df.index, columns=columns)
     df['Last_Updated'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
 
     logger.info(f"Saving to output file: {output_excel}")
-    df.to_excel(output_excel, index=False)
+    write_excel(df, output_excel)
     logger.info("Excel file saved successfully.")
 
 
 # -----------------------
-# Step 5: Run the Script
+# Step 7: Run the Script
 # -----------------------
 if __name__ == "__main__":
     update_excel_with_gst_details("nn.xlsx", "updated_output.xlsx")